@@ -1,130 +1,184 @@
 """Generate realistic synthetic mock data for CX Anomaly Detector."""
 
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Category labels for the categorical columns, indexed by generated code
+CATEGORIES = {
+    'channel': ['voice', 'chat', 'email'],
+    'language': ['en', 'es', 'fr', 'de'],
+    'queue': ['billing', 'support', 'sales'],
+}
+
+# Per-type metric ranges for anomalous interactions.
+# Tuples are uniform (low, high) ranges, lists are pools sampled uniformly.
+ANOMALY_PROFILES = {
+    # Very low satisfaction
+    'poor_csat': {
+        'csat': (1.0, 2.5),
+        'ies': (30, 55),
+        'complaints': [1, 2, 2, 3],
+        'aht_seconds': (400, 650),
+        'hold_time_seconds': (60, 150),
+        'transfers': [1, 1, 2, 2, 3],
+    },
+    # Excessive handle time
+    'high_aht': {
+        'csat': (2.5, 3.5),
+        'ies': (40, 60),
+        'complaints': [1, 2],
+        'aht_seconds': (600, 900),
+        'hold_time_seconds': (100, 200),
+        'transfers': [2, 2, 3, 3, 4],
+    },
+    # Combination of bad metrics
+    'multiple_issues': {
+        'csat': (1.5, 2.8),
+        'ies': (25, 50),
+        'complaints': [2, 2, 3, 3, 4],
+        'aht_seconds': (550, 800),
+        'hold_time_seconds': (120, 220),
+        'transfers': [2, 3, 3, 4],
+    },
+}
+
+def _build_profile_tables(profiles):
+    """
+    Stack per-type profile specs into lookup tables indexed by type code.
+    
+    Uniform ranges become (low, span) arrays; pools are padded to a common
+    width and paired with their true lengths so every type samples only
+    from its own values.
+    """
+    tables = {}
+    for name in next(iter(profiles.values())):
+        specs = [profile[name] for profile in profiles.values()]
+        if isinstance(specs[0], tuple):
+            low, high = np.array(specs, dtype=np.float64).T
+            tables[name] = ('uniform', low, high - low)
+        else:
+            width = max(len(spec) for spec in specs)
+            pools = np.array([spec + spec[:1] * (width - len(spec)) for spec in specs])
+            lengths = np.array([len(spec) for spec in specs])
+            tables[name] = ('pool', pools, lengths)
+    return tables
+
+ANOMALY_TABLES = _build_profile_tables(ANOMALY_PROFILES)
+
+def format_ids(prefix, start, n_samples):
+    """Build ``{prefix}_{i:04d}`` ids for ``start .. start + n_samples - 1`` with numpy string ops."""
+    numbers = np.char.zfill(np.arange(start, start + n_samples).astype('U'), 4)
+    return np.char.add(f'{prefix}_', numbers)
+
+def business_hour_timestamps(rng, n_samples, start_date, rows_per_day, row_offset=0):
+    """
+    Draw business-hour timestamps for a block of rows in one vectorized pass.
+    
+    The date advances after the first row and then every ``rows_per_day`` rows.
+    """
+    row = row_offset + np.arange(n_samples)
+    day_offset = (row + rows_per_day - 1) // rows_per_day
+    hour = rng.integers(8, 18, n_samples)
+    minute = rng.integers(0, 60, n_samples)
+    second = rng.integers(0, 60, n_samples)
+    timestamps = (
+        pd.Timestamp(start_date).normalize()
+        + pd.to_timedelta(day_offset, unit='D')
+        + pd.to_timedelta(hour * 3600 + minute * 60 + second, unit='s')
+    )
+    return timestamps.values.astype('datetime64[s]')
+
+def generate_normal_interactions(rng, n_samples, start_date, row_offset=0):
+    """Generate normal interaction records as a dict of typed column arrays."""
+    cols = {
+        'timestamp': np.empty(n_samples, dtype='datetime64[s]'),
+        'interaction_id': format_ids('int', row_offset + 1, n_samples),
+        'csat': np.empty(n_samples, dtype=np.float32),
+        'ies': np.empty(n_samples, dtype=np.float32),
+        'complaints': np.empty(n_samples, dtype=np.int16),
+        'aht_seconds': np.empty(n_samples, dtype=np.int32),
+        'hold_time_seconds': np.empty(n_samples, dtype=np.int16),
+        'transfers': np.empty(n_samples, dtype=np.int16),
+    }
+    
+    # Normal interactions have good metrics
+    np.round(np.clip(rng.normal(4.2, 0.5, n_samples), 1.0, 5.0), 1, out=cols['csat'])  # Mean 4.2, std 0.5
+    np.round(np.clip(rng.normal(78, 10, n_samples), 0, 100), 1, out=cols['ies'])  # Mean 78, std 10
+    cols['complaints'][:] = rng.choice([0, 1], n_samples, p=[0.9, 0.1])  # 10% have 1 complaint
+    cols['aht_seconds'][:] = np.maximum(rng.normal(320, 80, n_samples), 120)  # Mean 320s (~5 min), std 80s
+    cols['hold_time_seconds'][:] = np.maximum(rng.normal(35, 20, n_samples), 0)  # Mean 35s, std 20s
+    cols['transfers'][:] = rng.choice([0, 1], n_samples, p=[0.875, 0.125])  # 12.5% have 1 transfer
+    
+    # Categorical columns are drawn as integer codes into CATEGORIES
+    cols['channel'] = rng.choice(3, n_samples, p=[0.6, 0.3, 0.1]).astype(np.int8)
+    cols['language'] = rng.choice(4, n_samples, p=[0.6, 0.2, 0.1, 0.1]).astype(np.int8)
+    cols['queue'] = rng.choice(3, n_samples, p=[0.4, 0.5, 0.1]).astype(np.int8)
+    
+    # Generate timestamp (business hours, date advances every 50 interactions)
+    cols['timestamp'][:] = business_hour_timestamps(rng, n_samples, start_date, 50, row_offset)
+    
+    return cols
 
-np.random.seed(42)
+def generate_anomalous_interactions(rng, n_samples, start_date, start_id, row_offset=0):
+    """Generate anomalous interaction records as a dict of typed column arrays."""
+    cols = {
+        'timestamp': np.empty(n_samples, dtype='datetime64[s]'),
+        'interaction_id': format_ids('int', start_id + row_offset, n_samples),
+        'csat': np.empty(n_samples, dtype=np.float32),
+        'ies': np.empty(n_samples, dtype=np.float32),
+        'complaints': np.empty(n_samples, dtype=np.int16),
+        'aht_seconds': np.empty(n_samples, dtype=np.int32),
+        'hold_time_seconds': np.empty(n_samples, dtype=np.int16),
+        'transfers': np.empty(n_samples, dtype=np.int16),
+    }
+    
+    # Anomalous interactions have poor metrics; each column is one draw
+    # gathered through the per-type tables instead of a masked loop per type
+    type_code = rng.integers(0, len(ANOMALY_PROFILES), n_samples)
+    
+    for name, (kind, first, second) in ANOMALY_TABLES.items():
+        u = rng.random(n_samples)
+        if kind == 'uniform':
+            values = first[type_code] + second[type_code] * u
+            if name in ('csat', 'ies'):
+                values = np.round(values, 1)
+        else:
+            values = first[type_code, (u * second[type_code]).astype(np.intp)]
+        cols[name][:] = values
+    
+    # Categorical columns are drawn as integer codes into CATEGORIES
+    cols['channel'] = rng.choice(3, n_samples, p=[0.7, 0.25, 0.05]).astype(np.int8)
+    cols['language'] = rng.choice(4, n_samples, p=[0.6, 0.2, 0.1, 0.1]).astype(np.int8)
+    cols['queue'] = rng.choice(3, n_samples, p=[0.5, 0.45, 0.05]).astype(np.int8)
+    
+    # Generate timestamp (date advances every 3 interactions)
+    cols['timestamp'][:] = business_hour_timestamps(rng, n_samples, start_date, 3, row_offset)
+    
+    return cols
 
-def generate_normal_interactions(n_samples, start_date):
-    """Generate normal interaction records."""
-    data = []
-    current_date = start_date
-    
-    for i in range(n_samples):
-        # Normal interactions have good metrics
-        csat = np.random.normal(4.2, 0.5)  # Mean 4.2, std 0.5
-        csat = np.clip(csat, 1.0, 5.0)
-        
-        ies = np.random.normal(78, 10)  # Mean 78, std 10
-        ies = np.clip(ies, 0, 100)
-        
-        complaints = np.random.choice([0, 0, 0, 0, 0, 0, 0, 0, 0, 1], 1)[0]  # 10% have 1 complaint
-        
-        aht_seconds = np.random.normal(320, 80)  # Mean 320s (~5 min), std 80s
-        aht_seconds = max(120, aht_seconds)
-        
-        hold_time_seconds = np.random.normal(35, 20)  # Mean 35s, std 20s
-        hold_time_seconds = max(0, hold_time_seconds)
-        
-        transfers = np.random.choice([0, 0, 0, 0, 0, 0, 0, 1], 1)[0]  # 12.5% have 1 transfer
-        
-        channel = np.random.choice(['voice', 'chat', 'email'], p=[0.6, 0.3, 0.1])
-        language = np.random.choice(['en', 'es', 'fr', 'de'], p=[0.6, 0.2, 0.1, 0.1])
-        queue = np.random.choice(['billing', 'support', 'sales'], p=[0.4, 0.5, 0.1])
-        
-        # Generate timestamp (business hours, weekdays)
-        hour = np.random.randint(8, 18)
-        minute = np.random.randint(0, 60)
-        second = np.random.randint(0, 60)
-        timestamp = current_date.replace(hour=hour, minute=minute, second=second)
-        
-        data.append({
-            'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'interaction_id': f'int_{i+1:04d}',
-            'csat': round(csat, 1),
-            'ies': round(ies, 1),
-            'complaints': int(complaints),
-            'aht_seconds': int(aht_seconds),
-            'hold_time_seconds': int(hold_time_seconds),
-            'transfers': int(transfers),
-            'channel': channel,
-            'language': language,
-            'queue': queue
-        })
-        
-        # Advance date randomly
-        if i % 50 == 0:
-            current_date += timedelta(days=1)
-    
-    return data
+def generate_chunk(seed, n_normal, n_anomalies, start_date, normal_offset, anomaly_offset, start_id):
+    """Generate one chunk of normal and anomalous records from an independent seed."""
+    rng = np.random.default_rng(seed)
+    normal_data = generate_normal_interactions(rng, n_normal, start_date, normal_offset)
+    anomaly_data = generate_anomalous_interactions(
+        rng, n_anomalies, start_date, start_id, anomaly_offset
+    )
+    return normal_data, anomaly_data
 
-def generate_anomalous_interactions(n_samples, start_date, start_id):
-    """Generate anomalous interaction records."""
-    data = []
-    current_date = start_date
-    
-    for i in range(n_samples):
-        # Anomalous interactions have poor metrics
-        anomaly_type = np.random.choice(['poor_csat', 'high_aht', 'multiple_issues'])
-        
-        if anomaly_type == 'poor_csat':
-            # Very low satisfaction
-            csat = np.random.uniform(1.0, 2.5)
-            ies = np.random.uniform(30, 55)
-            complaints = np.random.choice([1, 2, 2, 3])
-            aht_seconds = np.random.uniform(400, 650)
-            hold_time_seconds = np.random.uniform(60, 150)
-            transfers = np.random.choice([1, 1, 2, 2, 3])
-            
-        elif anomaly_type == 'high_aht':
-            # Excessive handle time
-            csat = np.random.uniform(2.5, 3.5)
-            ies = np.random.uniform(40, 60)
-            complaints = np.random.choice([1, 2])
-            aht_seconds = np.random.uniform(600, 900)
-            hold_time_seconds = np.random.uniform(100, 200)
-            transfers = np.random.choice([2, 2, 3, 3, 4])
-            
-        else:  # multiple_issues
-            # Combination of bad metrics
-            csat = np.random.uniform(1.5, 2.8)
-            ies = np.random.uniform(25, 50)
-            complaints = np.random.choice([2, 2, 3, 3, 4])
-            aht_seconds = np.random.uniform(550, 800)
-            hold_time_seconds = np.random.uniform(120, 220)
-            transfers = np.random.choice([2, 3, 3, 4])
-        
-        channel = np.random.choice(['voice', 'chat', 'email'], p=[0.7, 0.25, 0.05])
-        language = np.random.choice(['en', 'es', 'fr', 'de'], p=[0.6, 0.2, 0.1, 0.1])
-        queue = np.random.choice(['billing', 'support', 'sales'], p=[0.5, 0.45, 0.05])
-        
-        # Generate timestamp
-        hour = np.random.randint(8, 18)
-        minute = np.random.randint(0, 60)
-        second = np.random.randint(0, 60)
-        timestamp = current_date.replace(hour=hour, minute=minute, second=second)
-        
-        data.append({
-            'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            'interaction_id': f'int_{start_id + i:04d}',
-            'csat': round(csat, 1),
-            'ies': round(ies, 1),
-            'complaints': int(complaints),
-            'aht_seconds': int(aht_seconds),
-            'hold_time_seconds': int(hold_time_seconds),
-            'transfers': int(transfers),
-            'channel': channel,
-            'language': language,
-            'queue': queue
-        })
-        
-        if i % 3 == 0:
-            current_date += timedelta(days=1)
-    
-    return data
+def _split(total, n_parts):
+    """Split a row count into n_parts near-equal chunk sizes."""
+    sizes = np.full(n_parts, total // n_parts)
+    sizes[:total % n_parts] += 1
+    return sizes
 
-def generate_dataset(total_samples, contamination_rate, dataset_name, start_date):
+def generate_dataset(total_samples, contamination_rate, dataset_name, start_date,
+                     seed_seq, n_workers=1):
     """Generate a complete dataset with specified contamination rate."""
     n_anomalies = int(total_samples * contamination_rate)
     n_normal = total_samples - n_anomalies
@@ -134,59 +188,106 @@ def generate_dataset(total_samples, contamination_rate, dataset_name, start_date
     print(f"  Normal: {n_normal} ({100*(1-contamination_rate):.1f}%)")
     print(f"  Anomalies: {n_anomalies} ({100*contamination_rate:.1f}%)")
     
+    # One independent child stream per chunk so chunks never overlap
+    normal_sizes = _split(n_normal, n_workers)
+    anomaly_sizes = _split(n_anomalies, n_workers)
+    normal_offsets = np.concatenate([[0], np.cumsum(normal_sizes)[:-1]])
+    anomaly_offsets = np.concatenate([[0], np.cumsum(anomaly_sizes)[:-1]])
+    chunk_args = (
+        seed_seq.spawn(n_workers),
+        normal_sizes,
+        anomaly_sizes,
+        [start_date] * n_workers,
+        normal_offsets,
+        anomaly_offsets,
+        [n_normal + 1] * n_workers,
+    )
+    
     # Generate data
-    normal_data = generate_normal_interactions(n_normal, start_date)
-    anomaly_data = generate_anomalous_interactions(n_anomalies, start_date, n_normal + 1)
+    if n_workers == 1:
+        chunks = list(map(generate_chunk, *chunk_args))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            chunks = list(executor.map(generate_chunk, *chunk_args))
     
-    # Combine and shuffle
-    all_data = normal_data + anomaly_data
-    df = pd.DataFrame(all_data)
+    # Normal rows first, then anomalies, matching the single-stream layout
+    parts = [normal for normal, _ in chunks] + [anomalies for _, anomalies in chunks]
+    
+    # Combine column-wise and shuffle
+    df = pd.DataFrame({
+        col: np.concatenate([part[col] for part in parts])
+        for col in parts[0]
+    })
+    df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    for col, categories in CATEGORIES.items():
+        df[col] = pd.Categorical.from_codes(df[col], categories=categories)
     df = df.sample(frac=1, random_state=42).reset_index(drop=True)
     
     # Update interaction IDs to be sequential after shuffle
-    df['interaction_id'] = [f'{dataset_name[:3]}_{i+1:04d}' for i in range(len(df))]
+    df['interaction_id'] = format_ids(dataset_name[:3], 1, len(df))
     
     return df
 
-# Generate training data
-print("="*60)
-train_df = generate_dataset(
-    total_samples=1000,
-    contamination_rate=0.07,  # 7% contamination
-    dataset_name='train',
-    start_date=datetime(2025, 1, 1, 8, 0, 0)
-)
-
-# Save training data
-train_path = 'data/input/mock_train.csv'
-train_df.to_csv(train_path, index=False)
-print(f"\nSaved to: {train_path}")
-print(f"Shape: {train_df.shape}")
-print(f"\nSample statistics:")
-print(f"  CSAT: {train_df['csat'].mean():.2f} ± {train_df['csat'].std():.2f}")
-print(f"  IES: {train_df['ies'].mean():.2f} ± {train_df['ies'].std():.2f}")
-print(f"  AHT: {train_df['aht_seconds'].mean():.0f}s ± {train_df['aht_seconds'].std():.0f}s")
-
-print("\n" + "="*60)
-
-# Generate inference data
-inference_df = generate_dataset(
-    total_samples=1000,
-    contamination_rate=0.05,  # 5% contamination
-    dataset_name='inference',
-    start_date=datetime(2025, 2, 1, 8, 0, 0)
-)
-
-# Save inference data
-inference_path = 'data/input/mock_inference.csv'
-inference_df.to_csv(inference_path, index=False)
-print(f"\nSaved to: {inference_path}")
-print(f"Shape: {inference_df.shape}")
-print(f"\nSample statistics:")
-print(f"  CSAT: {inference_df['csat'].mean():.2f} ± {inference_df['csat'].std():.2f}")
-print(f"  IES: {inference_df['ies'].mean():.2f} ± {inference_df['ies'].std():.2f}")
-print(f"  AHT: {inference_df['aht_seconds'].mean():.0f}s ± {inference_df['aht_seconds'].std():.0f}s")
+def main():
+    """Generate and save the training and inference mock datasets."""
+    parser = argparse.ArgumentParser(description="Generate synthetic CX interaction data")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to generate each dataset",
+    )
+    args = parser.parse_args()
+    
+    # Independent, reproducible streams for each dataset
+    train_seq, inference_seq = np.random.SeedSequence(42).spawn(2)
+    
+    # Generate training data
+    print("="*60)
+    train_df = generate_dataset(
+        total_samples=1000,
+        contamination_rate=0.07,  # 7% contamination
+        dataset_name='train',
+        start_date=datetime(2025, 1, 1, 8, 0, 0),
+        seed_seq=train_seq,
+        n_workers=args.workers,
+    )
+    
+    # Save training data
+    train_path = 'data/input/mock_train.csv'
+    pacsv.write_csv(pa.Table.from_pandas(train_df, preserve_index=False), train_path)
+    print(f"\nSaved to: {train_path}")
+    print(f"Shape: {train_df.shape}")
+    print(f"\nSample statistics:")
+    print(f"  CSAT: {train_df['csat'].mean():.2f} ± {train_df['csat'].std():.2f}")
+    print(f"  IES: {train_df['ies'].mean():.2f} ± {train_df['ies'].std():.2f}")
+    print(f"  AHT: {train_df['aht_seconds'].mean():.0f}s ± {train_df['aht_seconds'].std():.0f}s")
+    
+    print("\n" + "="*60)
+    
+    # Generate inference data
+    inference_df = generate_dataset(
+        total_samples=1000,
+        contamination_rate=0.05,  # 5% contamination
+        dataset_name='inference',
+        start_date=datetime(2025, 2, 1, 8, 0, 0),
+        seed_seq=inference_seq,
+        n_workers=args.workers,
+    )
+    
+    # Save inference data
+    inference_path = 'data/input/mock_inference.csv'
+    pacsv.write_csv(pa.Table.from_pandas(inference_df, preserve_index=False), inference_path)
+    print(f"\nSaved to: {inference_path}")
+    print(f"Shape: {inference_df.shape}")
+    print(f"\nSample statistics:")
+    print(f"  CSAT: {inference_df['csat'].mean():.2f} ± {inference_df['csat'].std():.2f}")
+    print(f"  IES: {inference_df['ies'].mean():.2f} ± {inference_df['ies'].std():.2f}")
+    print(f"  AHT: {inference_df['aht_seconds'].mean():.0f}s ± {inference_df['aht_seconds'].std():.0f}s")
+    
+    print("\n" + "="*60)
+    print("Mock data generation complete!")
+    print("="*60)
 
-print("\n" + "="*60)
-print("Mock data generation complete!")
-print("="*60)
+if __name__ == "__main__":
+    main()
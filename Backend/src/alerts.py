@@ -2,9 +2,11 @@
 
 import os
 import smtplib
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager, suppress
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 import requests
 from dotenv import load_dotenv
@@ -15,6 +17,13 @@ load_dotenv()
 
 log = get_logger(__name__)
 
+# Shared HTTP session so repeated webhook calls reuse the TCP/TLS connection
+_session = requests.Session()
+
+# Slack and email are sent side by side so an alert costs the slower channel, not both
+_ALERT_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alerts")
+ALERT_TIMEOUT_SECONDS = 15
+
 
 def send_slack_alert(message: str, webhook_url: Optional[str] = None) -> bool:
     """
@@ -36,7 +45,7 @@ def send_slack_alert(message: str, webhook_url: Optional[str] = None) -> bool:
     
     try:
         payload = {"text": message}
-        response = requests.post(webhook_url, json=payload, timeout=10)
+        response = _session.post(webhook_url, json=payload, timeout=10)
         response.raise_for_status()
         
         log.info("Slack alert sent successfully")
@@ -47,11 +56,71 @@ def send_slack_alert(message: str, webhook_url: Optional[str] = None) -> bool:
         return False
 
 
+def alerts_enabled() -> bool:
+    """Whether alert notifications are switched on (``ENABLE_ALERTS``)."""
+    return os.getenv("ENABLE_ALERTS", "false").lower() == "true"
+
+
+def open_smtp_connection() -> Optional[smtplib.SMTP]:
+    """
+    Open an authenticated SMTP connection from environment settings.
+    
+    The caller owns the connection and should close it (e.g. via ``with``)
+    once all messages for the run have been sent.
+    
+    Returns:
+        Logged-in SMTP client, or None if credentials are not configured
+    """
+    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
+    smtp_port = int(os.getenv("SMTP_PORT", 587))
+    smtp_user = os.getenv("SMTP_USER")
+    smtp_password = os.getenv("SMTP_PASSWORD")
+    
+    if not all([smtp_user, smtp_password]):
+        return None
+    
+    # Bounded so a stalled server cannot hold a sender (or its caller) forever
+    server = smtplib.SMTP(smtp_host, smtp_port, timeout=ALERT_TIMEOUT_SECONDS)
+    try:
+        server.starttls()
+        server.login(smtp_user, smtp_password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+@contextmanager
+def smtp_session() -> Iterator[Optional[smtplib.SMTP]]:
+    """
+    Hold one SMTP connection for all the emails a run sends.
+    
+    Yields:
+        Logged-in SMTP client, or None if alerts are disabled, credentials
+        are not configured, or the server could not be reached (emails then
+        fall back to their own connections)
+    """
+    server = None
+    if alerts_enabled():
+        try:
+            server = open_smtp_connection()
+        except Exception as e:
+            log.error(f"Failed to open SMTP connection: {e}")
+    
+    try:
+        yield server
+    finally:
+        if server is not None:
+            with suppress(Exception):
+                server.quit()
+
+
 def send_email_alert(
     subject: str,
     body: str,
     to_addresses: Optional[List[str]] = None,
     from_address: Optional[str] = None,
+    smtp_client: Optional[smtplib.SMTP] = None,
 ) -> bool:
     """
     Send email alert via SMTP.
@@ -61,6 +130,8 @@ def send_email_alert(
         body: Email body
         to_addresses: List of recipient emails
         from_address: Sender email
+        smtp_client: Already logged-in SMTP connection to reuse
+            (defaults to opening a new one for this message)
     
     Returns:
         True if successful, False otherwise
@@ -72,12 +143,10 @@ def send_email_alert(
         to_str = os.getenv("ALERT_EMAIL_TO", "")
         to_addresses = [addr.strip() for addr in to_str.split(",") if addr.strip()]
     
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    
-    if not all([from_address, to_addresses, smtp_user, smtp_password]):
+    has_credentials = smtp_client is not None or all(
+        [os.getenv("SMTP_USER"), os.getenv("SMTP_PASSWORD")]
+    )
+    if not all([from_address, to_addresses, has_credentials]):
         log.warning("Email configuration incomplete, skipping alert")
         return False
     
@@ -89,11 +158,12 @@ def send_email_alert(
         msg["Subject"] = subject
         msg.attach(MIMEText(body, "plain"))
         
-        # Send via SMTP
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
+        # Send via SMTP, reusing the caller's connection when given
+        if smtp_client is not None:
+            smtp_client.send_message(msg)
+        else:
+            with open_smtp_connection() as server:
+                server.send_message(msg)
         
         log.info(f"Email alert sent to {len(to_addresses)} recipients")
         return True
@@ -142,6 +212,7 @@ def send_anomaly_alert(
     total_records: int,
     output_path: Optional[str] = None,
     threshold: Optional[float] = None,
+    smtp_client: Optional[smtplib.SMTP] = None,
 ) -> None:
     """
     Send anomaly detection alert via configured channels.
@@ -151,10 +222,11 @@ def send_anomaly_alert(
         total_records: Total records processed
         output_path: Path to results file
         threshold: Anomaly threshold used
+        smtp_client: Long-lived SMTP connection to reuse across alerts (e.g.
+            from ``smtp_session``); the email has finished with it on return
     """
     # Check if alerts are enabled
-    alerts_enabled = os.getenv("ENABLE_ALERTS", "false").lower() == "true"
-    if not alerts_enabled:
+    if not alerts_enabled():
         log.info("Alerts disabled, skipping notification")
         return
     
@@ -163,12 +235,22 @@ def send_anomaly_alert(
     
     log.info(f"Sending alert for {num_anomalies} anomalies")
     
-    # Send to Slack
-    send_slack_alert(message)
-    
-    # Send email
+    # Send to Slack and email concurrently; both log their own failures
     subject = f"CX Anomaly Alert: {num_anomalies} anomalies detected"
-    send_email_alert(subject, message)
+    email_future = _ALERT_POOL.submit(send_email_alert, subject, message, smtp_client=smtp_client)
+    futures = [_ALERT_POOL.submit(send_slack_alert, message), email_future]
+    
+    _, pending = wait(futures, timeout=ALERT_TIMEOUT_SECONDS)
+    if pending:
+        log.warning(
+            f"{len(pending)} alert channel(s) still sending after "
+            f"{ALERT_TIMEOUT_SECONDS}s, continuing without waiting"
+        )
+    
+    if smtp_client is not None:
+        # The caller closes its connection once we return, so the email must
+        # be done with it (each SMTP call is bounded by the socket timeout)
+        wait([email_future])
 
 
 if __name__ == "__main__":
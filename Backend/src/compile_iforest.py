@@ -0,0 +1,79 @@
+"""Compile the trained Isolation Forest into a native scoring library."""
+
+import argparse
+import os
+from pathlib import Path
+
+import joblib
+from dotenv import load_dotenv
+
+from src.telemetry import get_logger, setup_logging
+from src.train import load_config
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+
+def compile_iforest(config: dict) -> str:
+    """
+    Compile the saved IForest artifact to a shared library with Treelite.
+
+    The generated C code unrolls every tree into branch-only comparisons, so
+    scoring avoids sklearn's per-node tree traversal. ``predict.load_artifacts``
+    picks the library up automatically when it is newer than the model.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Path to the compiled library
+    """
+    # Optional dependencies, only needed for this offline step
+    import tl2cgen
+    import treelite
+
+    artifacts_dir = Path(config["artifacts"]["dir"])
+    model_path = artifacts_dir / config["artifacts"]["model_template"].format(name="iforest")
+    lib_path = artifacts_dir / config["artifacts"]["iforest_lib"]
+
+    log.info("Compiling {} -> {}", model_path, lib_path)
+
+    iforest = joblib.load(model_path)
+    tl_model = treelite.sklearn.import_model(iforest)
+    tl2cgen.export_lib(
+        tl_model,
+        toolchain="gcc",
+        libpath=lib_path,
+        params={"parallel_comp": os.cpu_count() or 1},
+    )
+
+    return str(lib_path)
+
+
+def main():
+    """Main IForest compilation step."""
+    parser = argparse.ArgumentParser(description="Compile the trained IForest with Treelite")
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="Path to configuration file (overrides CONFIG_PATH env var)",
+    )
+    args = parser.parse_args()
+
+    # Setup logging
+    log_level = os.getenv("LOG_LEVEL", "INFO")
+    setup_logging(log_level=log_level)
+
+    try:
+        config = load_config(args.config)
+        lib_path = compile_iforest(config)
+        log.info("Compiled IForest saved to: {}", lib_path)
+    except Exception as e:
+        log.error("IForest compilation failed with error: {}", e)
+        raise
+
+
+if __name__ == "__main__":
+    main()
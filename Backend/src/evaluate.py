@@ -5,15 +5,17 @@ import os
 from pathlib import Path
 
 import joblib
+from joblib import Parallel, delayed
 import matplotlib.pyplot as plt
+from mpl_toolkits.axes_grid1 import make_axes_locatable
 import numpy as np
 import pandas as pd
 import seaborn as sns
 from dotenv import load_dotenv
 from scipy.stats import pearsonr
 
-from src.features import prepare_features, validate_schema
-from src.io_utils import load_csv
+from src.features import build_read_schema, prepare_features, validate_schema
+from src.io_utils import file_fingerprint, load_csv
 from src.telemetry import get_logger, setup_logging
 
 load_dotenv()
@@ -35,9 +37,13 @@ def load_artifacts(config: dict) -> dict:
     
     log.info(f"Loading artifacts from: {artifacts_dir}")
     
-    # Load shared preprocessor
+    # Preprocessor and models are loaded with mmap_mode: LOF's training
+    # points and the preprocessor's numeric arrays stay memory-mapped, paged
+    # in lazily and shared across processes. IForest tree nodes are copied
+    # into memory regardless, as sklearn's Tree unpickling makes its own
+    # arrays. Artifacts are saved uncompressed, which mmap requires.
     preprocessor_path = Path(artifacts_dir) / config["artifacts"]["preprocessor"]
-    preprocessor = joblib.load(preprocessor_path)
+    preprocessor = joblib.load(preprocessor_path, mmap_mode="r")
     
     # Load each model and its metadata
     models = {}
@@ -50,7 +56,7 @@ def load_artifacts(config: dict) -> dict:
         
         # Load model
         model_path = Path(artifacts_dir) / model_template.format(name=model_name)
-        models[model_name] = joblib.load(model_path)
+        models[model_name] = joblib.load(model_path, mmap_mode="r")
         
         # Load metadata
         meta_path = Path(artifacts_dir) / meta_template.format(name=model_name)
@@ -60,22 +66,61 @@ def load_artifacts(config: dict) -> dict:
     global_meta_path = Path(artifacts_dir) / "meta_global.joblib"
     metadata["global"] = joblib.load(global_meta_path)
     
+    # Memory-map cached training features if training wrote them
+    X_cache = None
+    feature_cache = config["artifacts"].get("feature_cache")
+    if feature_cache and (Path(artifacts_dir) / feature_cache).exists():
+        X_cache = np.load(Path(artifacts_dir) / feature_cache, mmap_mode="r")
+        log.info(f"Using cached training features with shape {X_cache.shape}")
+    
     log.info(f"Artifacts loaded successfully for models: {list(models.keys())}")
     
     return {
         "preprocessor": preprocessor,
         "models": models,
         "metadata": metadata,
+        "X_cache": X_cache,
     }
 
 
-def evaluate_models(config: dict, artifacts: dict) -> pd.DataFrame:
+def _score_model(model_name: str, model, X, metadata: dict) -> tuple:
+    """
+    Score features with a single model and apply its training threshold.
+    
+    Args:
+        model_name: Configured model name
+        model: Fitted model
+        X: Transformed feature matrix
+        metadata: Model metadata with algorithm and threshold
+    
+    Returns:
+        Tuple of (model_name, scores, is_anomaly)
+    """
+    algorithm = metadata["algorithm"]
+    
+    # Get scores based on algorithm
+    if algorithm == "IsolationForest":
+        scores = -model.score_samples(X)  # Negate to make higher = more anomalous
+    elif algorithm == "LOF":
+        # For LOF with novelty=True, use score_samples (negative scores, so negate)
+        scores = -model.detector_.score_samples(X)
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    
+    # Apply threshold
+    is_anomaly = scores >= metadata["threshold"]
+    
+    return model_name, scores, is_anomaly
+
+
+def evaluate_models(config: dict, artifacts: dict, verbose: bool = False) -> pd.DataFrame:
     """
     Evaluate all models on training data and generate comparison scores.
     
     Args:
         config: Configuration dictionary
         artifacts: Dictionary with preprocessor, models, and metadata
+        verbose: Also report the Pearson p-value for the score correlation
     
     Returns:
         DataFrame with scores from all models
@@ -83,58 +128,58 @@ def evaluate_models(config: dict, artifacts: dict) -> pd.DataFrame:
     # Load training data for evaluation
     train_path = config["data"]["train_path"]
     log.info(f"Loading training data from: {train_path}")
-    df = load_csv(train_path)
+    train_fingerprint = file_fingerprint(train_path)
+    df = load_csv(train_path, schema=build_read_schema(config["features"]))
     
     # Validate and prepare features
     validate_schema(df, config["features"])
     feature_df, identifier_cols = prepare_features(df, config["features"], is_training=False)
     
-    # Transform features
-    log.info("Transforming features...")
-    X = artifacts["preprocessor"].transform(feature_df)
+    # Transform features, reusing the training-time matrix only when the
+    # training data is unchanged since the models were trained
+    X = artifacts.get("X_cache")
+    cache_fingerprint = artifacts["metadata"]["global"].get("train_fingerprint")
+    if X is not None and X.shape[0] == len(df) and cache_fingerprint == train_fingerprint:
+        log.info("Reusing cached transformed features")
+    else:
+        if X is not None:
+            log.info("Training data changed since training, ignoring cached features")
+        log.info("Transforming features...")
+        X = artifacts["preprocessor"].transform(feature_df)
     
-    # Score with each model
-    results_df = pd.DataFrame()
+    # Collect output columns, identifiers first, and build the frame once
+    results = {col: df[col].values for col in identifier_cols if col in df.columns}
     
-    # Add identifier columns first
-    for col in identifier_cols:
-        if col in df.columns:
-            results_df[col] = df[col].values
+    # Score all models concurrently; each reads the same X and the heavy
+    # sklearn scoring paths release the GIL
+    log.info(f"Computing scores for {list(artifacts['models'].keys())}...")
+    scored = Parallel(n_jobs=len(artifacts["models"]), prefer="threads")(
+        delayed(_score_model)(model_name, model, X, artifacts["metadata"][model_name])
+        for model_name, model in artifacts["models"].items()
+    )
     
-    # Score with each model
-    for model_name, model in artifacts["models"].items():
-        log.info(f"Computing scores for {model_name}...")
-        metadata = artifacts["metadata"][model_name]
-        algorithm = metadata["algorithm"]
-        threshold = metadata["threshold"]
-        
-        # Get scores based on algorithm
-        if algorithm == "IsolationForest":
-            scores = -model.score_samples(X)  # Negate to make higher = more anomalous
-        elif algorithm == "LOF":
-            # For LOF with novelty=True, use score_samples (negative scores, so negate)
-            scores = -model.detector_.score_samples(X)
-        else:
-            raise ValueError(f"Unsupported algorithm: {algorithm}")
-        
-        # Apply threshold
-        is_anomaly = scores >= threshold
-        
+    for model_name, scores, is_anomaly in scored:
         # Add to results
-        results_df[f"{model_name}_score"] = scores
-        results_df[f"{model_name}_anomaly"] = is_anomaly
+        results[f"{model_name}_score"] = scores
+        results[f"{model_name}_anomaly"] = is_anomaly
         
         # Log summary statistics
         log.info(f"{model_name} - Anomalies detected: {is_anomaly.sum()} ({100 * is_anomaly.mean():.2f}%)")
         log.info(f"{model_name} - Score stats: Min={scores.min():.4f}, Max={scores.max():.4f}, "
                  f"Mean={scores.mean():.4f}, Median={np.median(scores):.4f}")
     
+    results_df = pd.DataFrame(results)
+    
     # Compute correlation between model scores
     model_names = list(artifacts["models"].keys())
     if len(model_names) == 2:
-        score_cols = [f"{name}_score" for name in model_names]
-        corr, pval = pearsonr(results_df[score_cols[0]], results_df[score_cols[1]])
-        log.info(f"Score correlation between {model_names[0]} and {model_names[1]}: {corr:.4f} (p={pval:.4e})")
+        a, b = (results_df[f"{name}_score"].values for name in model_names)
+        if verbose:
+            corr, pval = pearsonr(a, b)
+            log.info(f"Score correlation between {model_names[0]} and {model_names[1]}: {corr:.4f} (p={pval:.4e})")
+        else:
+            corr = float(np.corrcoef(a, b)[0, 1])
+            log.info(f"Score correlation between {model_names[0]} and {model_names[1]}: {corr:.4f}")
     
     log.info("=" * 60)
     log.info(f"Evaluation Summary - Total samples: {len(results_df)}")
@@ -143,6 +188,33 @@ def evaluate_models(config: dict, artifacts: dict) -> pd.DataFrame:
     return results_df
 
 
+def _stacked_histogram(data: pd.DataFrame, bins: int, **kwargs) -> None:
+    """
+    Draw one facet's score histogram, stacked by classification.
+    
+    Counts are binned once with np.histogram over the facet's full score
+    range and rendered as bars, rather than letting matplotlib re-bin.
+    
+    Args:
+        data: Long-form rows for a single model (score, is_anomaly)
+        bins: Number of histogram bins
+        **kwargs: Styling passed by FacetGrid (ignored)
+    """
+    ax = plt.gca()
+    scores = data["score"].values
+    is_anomaly = data["is_anomaly"].values.astype(bool)
+    
+    edges = np.histogram_bin_edges(scores, bins=bins)
+    widths = np.diff(edges)
+    normal_counts, _ = np.histogram(scores[~is_anomaly], bins=edges)
+    anomaly_counts, _ = np.histogram(scores[is_anomaly], bins=edges)
+    
+    ax.bar(edges[:-1], normal_counts, width=widths, align="edge",
+           color="skyblue", edgecolor="black", alpha=0.7, label="Normal")
+    ax.bar(edges[:-1], anomaly_counts, width=widths, align="edge", bottom=normal_counts,
+           color="salmon", edgecolor="black", alpha=0.7, label="Anomaly")
+
+
 def plot_score_distribution(results_df: pd.DataFrame, artifacts: dict, 
                             output_path: str, bins: int = 50) -> None:
     """
@@ -157,50 +229,62 @@ def plot_score_distribution(results_df: pd.DataFrame, artifacts: dict,
     log.info(f"Creating score distribution comparison plot...")
     
     model_names = list(artifacts["models"].keys())
-    n_models = len(model_names)
+    n_rows = len(results_df)
     
-    # Create figure with subplots (2 rows per model)
-    fig, axes = plt.subplots(n_models, 2, figsize=(16, 6 * n_models))
+    # Long form: one row per (model, interaction) so a single grid draws every model
+    long_df = pd.DataFrame({
+        "model": np.repeat(model_names, n_rows),
+        "score": np.concatenate([results_df[f"{name}_score"].values for name in model_names]),
+        "is_anomaly": np.concatenate([results_df[f"{name}_anomaly"].values for name in model_names]),
+    })
     
-    # If only one model, wrap axes in list
-    if n_models == 1:
-        axes = [axes]
+    # Histogram per model, stacked by classification; each facet is binned
+    # over its own score range. Facets are widened to leave room for the
+    # box panel split off their right side below
+    g = sns.FacetGrid(long_df, col="model", sharex=False, sharey=False, height=6, aspect=1.9)
+    g.map_dataframe(_stacked_histogram, bins=bins)
     
-    for idx, model_name in enumerate(model_names):
-        score_col = f"{model_name}_score"
-        anomaly_col = f"{model_name}_anomaly"
-        threshold = artifacts["metadata"][model_name]["threshold"]
-        scores = results_df[score_col].values
+    # Box summaries by classification, from one grouped quantile pass over all models
+    quantiles = (
+        long_df.groupby(["model", "is_anomaly"])["score"]
+        .quantile([0, 0.25, 0.5, 0.75, 1])
+        .unstack()
+    )
+    
+    for model_name, ax in g.axes_dict.items():
+        stats = [
+            {
+                "label": "Anomaly" if is_anomaly else "Normal",
+                "whislo": q[0], "q1": q[0.25], "med": q[0.5], "q3": q[0.75], "whishi": q[1],
+            }
+            for (_, is_anomaly), q in quantiles.loc[[model_name]].iterrows()
+        ]
+        # Own panel beside the histogram, so it never covers the score tail
+        box_ax = make_axes_locatable(ax).append_axes("right", size="40%", pad=0.9)
+        box_ax.bxp(stats, showfliers=False)
+        box_ax.set_ylabel("Anomaly Score")
+        box_ax.set_title(f"{model_name.upper()} - Scores by Classification")
+        box_ax.grid(True, alpha=0.3)
         
-        # Histogram of scores
-        ax1 = axes[idx][0]
-        ax1.hist(scores, bins=bins, color="skyblue", edgecolor="black", alpha=0.7)
-        ax1.axvline(threshold, color="red", linestyle="--", linewidth=2, 
+        threshold = artifacts["metadata"][model_name]["threshold"]
+        ax.axvline(threshold, color="red", linestyle="--", linewidth=2,
                    label=f"Threshold: {threshold:.4f}")
-        ax1.set_xlabel("Anomaly Score")
-        ax1.set_ylabel("Frequency")
-        ax1.set_title(f"{model_name.upper()} - Anomaly Score Distribution")
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        
-        # Box plot by anomaly status
-        ax2 = axes[idx][1]
-        results_df.boxplot(column=score_col, by=anomaly_col, ax=ax2)
-        ax2.set_xlabel("Is Anomaly")
-        ax2.set_ylabel("Anomaly Score")
-        ax2.set_title(f"{model_name.upper()} - Scores by Classification")
-        plt.sca(ax2)
-        plt.xticks([1, 2], ["False", "True"])
-    
-    plt.suptitle("Multi-Model Anomaly Score Comparison", fontsize=16, y=0.995)
-    plt.tight_layout()
+        ax.set_xlabel("Anomaly Score")
+        ax.set_ylabel("Frequency")
+        ax.set_title(f"{model_name.upper()} - Anomaly Score Distribution")
+        ax.legend(loc="upper right")
+        ax.grid(True, alpha=0.3)
+    
+    # Keep each box panel clear of the next facet's axis labels
+    g.figure.subplots_adjust(wspace=0.25)
+    g.figure.suptitle("Multi-Model Anomaly Score Comparison", fontsize=16, y=1.02)
     
     # Save plot
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    g.savefig(output_path, dpi=150, bbox_inches="tight")
     log.info(f"Comparison plot saved to: {output_path}")
     
-    plt.close()
+    plt.close(g.figure)
 
 
 def main():
@@ -212,6 +296,11 @@ def main():
         default=None,
         help="Path to configuration file",
     )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Report full Pearson statistics (including p-value) for score correlation",
+    )
     args = parser.parse_args()
     
     # Setup logging
@@ -231,7 +320,7 @@ def main():
         artifacts = load_artifacts(config)
         
         # Evaluate models
-        results_df = evaluate_models(config, artifacts)
+        results_df = evaluate_models(config, artifacts, verbose=args.verbose)
         
         # Plot score distribution
         plot_output = config["evaluation"]["plot_output"]
@@ -1,18 +1,47 @@
 """Feature engineering and preprocessing pipeline."""
 
+from itertools import chain
 from typing import List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder, StandardScaler, MinMaxScaler
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler, MinMaxScaler
 
 from src.telemetry import get_logger
 
 log = get_logger(__name__)
 
 
+def _to_float32(X):
+    """Cast transformer output to float32 without copying if already float32."""
+    return X.astype(np.float32, copy=False)
+
+
+def ensure_float32(X):
+    """
+    Return a transformed feature matrix as float32 for scoring.
+    
+    Preprocessors fitted before the pipeline emitted float32 still produce
+    float64; this casts those once. Dense output is also made row-major so
+    each sample's features are contiguous for the tree and kNN walks. It is
+    a no-op for matrices that are already in this layout.
+    
+    Args:
+        X: Dense ndarray or scipy sparse matrix
+    
+    Returns:
+        float32 matrix of the same kind
+    """
+    if isinstance(X, np.ndarray):
+        return np.ascontiguousarray(X, dtype=np.float32)
+    if X.dtype == np.float32:
+        return X
+    return X.astype(np.float32)
+
+
 def build_preprocessor(
     numeric_features: List[str],
     categorical_features: List[str],
@@ -33,20 +62,25 @@ def build_preprocessor(
     Returns:
         Fitted ColumnTransformer
     """
-    log.info(f"Building preprocessor with {len(numeric_features)} numeric, "
-             f"{len(categorical_features)} categorical features")
+    log.info("Building preprocessor with {} numeric, {} categorical features",
+             len(numeric_features), len(categorical_features))
     
-    # Numeric pipeline: impute then scale
+    # Numeric pipeline: impute, scale, then emit float32 (the detectors do not
+    # need double precision and float32 halves the bytes moved when scoring)
     scaler = StandardScaler() if scale_method == "standard" else MinMaxScaler()
     numeric_pipeline = Pipeline([
         ("imputer", SimpleImputer(strategy=numeric_strategy)),
         ("scaler", scaler),
+        ("to_float32", FunctionTransformer(_to_float32, feature_names_out="one-to-one")),
     ])
     
-    # Categorical pipeline: impute with constant 'missing' then one-hot encode
+    # Categorical pipeline: impute with constant 'missing' then one-hot encode.
+    # The one-hot block stays sparse so high-cardinality columns are never densified.
     categorical_pipeline = Pipeline([
         ("imputer", SimpleImputer(strategy="constant", fill_value="missing")),
-        ("onehot", OneHotEncoder(handle_unknown=categorical_unknown, sparse_output=False)),
+        ("onehot", OneHotEncoder(
+            handle_unknown=categorical_unknown, sparse_output=True, dtype=np.float32
+        )),
     ])
     
     # Combine pipelines
@@ -56,7 +90,11 @@ def build_preprocessor(
     if categorical_features:
         transformers.append(("cat", categorical_pipeline, categorical_features))
     
-    preprocessor = ColumnTransformer(transformers=transformers, remainder="drop")
+    # Output is CSR when the combined matrix is under 30% dense, otherwise dense;
+    # both IsolationForest and LOF accept either
+    preprocessor = ColumnTransformer(
+        transformers=transformers, remainder="drop", sparse_threshold=0.3
+    )
     
     return preprocessor
 
@@ -88,17 +126,71 @@ def prepare_features(
     
     missing_cols = expected_cols - set(df.columns)
     if missing_cols and is_training:
-        log.warning(f"Missing expected columns: {missing_cols}")
+        log.warning("Missing expected columns: {}", missing_cols)
     
-    # Create feature DataFrame (exclude identifiers and drop columns)
+    # Create feature DataFrame (exclude identifiers and drop columns).
+    # Column selection is enough: the transformers never mutate their input.
     feature_cols = [c for c in df.columns if c not in identifier_cols and c not in drop_cols]
-    feature_df = df[feature_cols].copy()
+    feature_df = df[feature_cols]
     
-    log.info(f"Prepared {len(feature_df.columns)} feature columns from {len(df)} rows")
+    # Numeric features are modeled in float32; categoricals use the pandas
+    # category dtype so one-hot encoding works on integer codes, not strings
+    # (both casts are no-ops for columns already read with these dtypes)
+    feature_df = feature_df.astype({
+        **{c: np.float32 for c in numeric_cols if c in feature_df.columns},
+        **{c: "category" for c in categorical_cols if c in feature_df.columns},
+    })
+    
+    log.info("Prepared {} feature columns from {} rows", len(feature_df.columns), len(df))
     
     return feature_df, identifier_cols
 
 
+def build_read_schema(config: dict, parse_dates: bool = True) -> dict:
+    """
+    Build the ``pd.read_csv`` dtype spec for the configured columns.
+    
+    Numeric features are read directly as float32 (the dtype they are
+    modeled in), categoricals as pandas categories, and a ``timestamp``
+    identifier is parsed as datetime.
+    
+    Args:
+        config: Feature configuration dict
+        parse_dates: Parse the timestamp identifier; when False it is kept
+            as the original string so it can be written back out verbatim
+    
+    Returns:
+        Dict with ``dtype`` and ``parse_dates`` keys for ``load_csv``
+    """
+    identifier_cols = config.get("identifier_columns", ["interaction_id", "timestamp"])
+    timestamp_cols = [col for col in identifier_cols if col == "timestamp"]
+    
+    dtype = {col: "float32" for col in config.get("numeric", [])}
+    dtype.update({col: "category" for col in config.get("categorical", [])})
+    if not parse_dates:
+        dtype.update({col: "str" for col in timestamp_cols})
+    
+    return {
+        "dtype": dtype,
+        "parse_dates": timestamp_cols if parse_dates else [],
+    }
+
+
+def get_read_columns(config: dict) -> list:
+    """
+    List the input columns scoring needs: identifiers plus model features.
+    
+    Args:
+        config: Feature configuration dict
+    
+    Returns:
+        Column names to read, identifiers first
+    """
+    identifier_cols = config.get("identifier_columns", ["interaction_id", "timestamp"])
+    feature_cols = config.get("numeric", []) + config.get("categorical", [])
+    return list(dict.fromkeys(identifier_cols + feature_cols))
+
+
 def validate_schema(df: pd.DataFrame, config: dict) -> bool:
     """
     Validate that DataFrame has expected columns.
@@ -134,17 +226,9 @@ def get_feature_names(preprocessor: ColumnTransformer) -> List[str]:
     Returns:
         List of feature names after transformation
     """
-    feature_names = []
-    
-    for name, transformer, columns in preprocessor.transformers_:
-        if name == "remainder":
-            continue
-            
-        if hasattr(transformer, "get_feature_names_out"):
-            names = transformer.get_feature_names_out()
-        else:
-            names = columns
-        
-        feature_names.extend(names)
-    
-    return feature_names
+    return list(chain.from_iterable(
+        transformer.get_feature_names_out()
+        if hasattr(transformer, "get_feature_names_out") else columns
+        for name, transformer, columns in preprocessor.transformers_
+        if name != "remainder"
+    ))
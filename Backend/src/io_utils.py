@@ -1,50 +1,272 @@
 """I/O utilities for loading and saving data."""
 
+import csv
+import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, List, Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from loguru import logger
 
 from src.telemetry import get_logger
 
 log = get_logger(__name__)
 
+# Arrow CSV block size; large blocks keep every parser thread busy
+ARROW_BLOCK_SIZE = 64 << 20
 
-def load_csv(path: str, **kwargs) -> pd.DataFrame:
+# Upper bound on CSV shards parsed at once when a path names several files
+MAX_SHARD_WORKERS = 16
+
+MB = 1024 * 1024
+
+
+@lru_cache(maxsize=1)
+def _get_s3_client():
+    """Create the S3 client once per process and share it across calls."""
+    import boto3
+    
+    return boto3.session.Session().client("s3")
+
+
+def _s3_transfer_config():
+    """Multipart, multithreaded transfer settings for large S3 objects."""
+    from boto3.s3.transfer import TransferConfig
+    
+    return TransferConfig(
+        multipart_threshold=8 * MB,
+        multipart_chunksize=16 * MB,
+        max_concurrency=int(os.getenv("S3_CONCURRENCY", "16")),
+        io_chunksize=1 * MB,
+        use_threads=True,
+    )
+
+
+def _arrow_column_types(schema: dict) -> dict:
+    """Map a ``load_csv`` schema's numpy/pandas dtype names to Arrow types."""
+    column_types = {}
+    for col, dtype in schema.get("dtype", {}).items():
+        if dtype in ("str", "string", str):
+            column_types[col] = pa.string()
+        elif dtype == "category":
+            # Dictionary-encoded columns convert to pandas Categorical
+            column_types[col] = pa.dictionary(pa.int32(), pa.string())
+        else:
+            column_types[col] = pa.from_numpy_dtype(np.dtype(dtype))
+    return column_types
+
+
+def _csv_header(path: str) -> List[str]:
+    """Read the column names from a local CSV's header line."""
+    with open(path, newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def _arrow_convert_options(
+    schema: dict, path: str, columns: Optional[List[str]] = None
+) -> pacsv.ConvertOptions:
+    """Build Arrow CSV conversion options from a ``load_csv`` schema."""
+    options = pacsv.ConvertOptions(
+        column_types=_arrow_column_types(schema),
+        strings_can_be_null=True,
+    )
+    if columns is not None:
+        # Keep file order and skip requested columns this file does not have
+        wanted = set(columns)
+        options.include_columns = [col for col in _csv_header(path) if col in wanted]
+    return options
+
+
+def resolve_paths(path: str) -> List[str]:
+    """
+    Expand a directory or glob pattern into the CSV files it names.
+    
+    Args:
+        path: Local file path, directory of ``*.csv`` shards, or glob pattern
+    
+    Returns:
+        Sorted list of matching file paths (just ``[path]`` for a plain file)
+    """
+    if os.path.isdir(path):
+        paths = sorted(glob.glob(os.path.join(path, "*.csv")))
+    elif any(char in path for char in "*?["):
+        paths = sorted(glob.glob(path))
+    else:
+        return [path]
+    
+    if not paths:
+        raise FileNotFoundError(f"No CSV files match: {path}")
+    return paths
+
+
+def file_fingerprint(path: str) -> List[tuple]:
+    """
+    Identify the current contents of a local CSV input by file metadata.
+    
+    Args:
+        path: Local file path, directory of ``*.csv`` shards, or glob pattern
+    
+    Returns:
+        List of (absolute path, size in bytes, mtime in ns) per resolved file;
+        any rewrite of the data changes it
+    """
+    fingerprint = []
+    for file_path in resolve_paths(path):
+        stat = os.stat(file_path)
+        fingerprint.append((os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns))
+    return fingerprint
+
+
+def _read_table_arrow(path: str, schema: dict, columns: Optional[List[str]] = None) -> pa.Table:
+    """Parse one local CSV into an Arrow table with the multithreaded reader."""
+    return pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True),
+        convert_options=_arrow_convert_options(schema, path, columns),
+    )
+
+
+def _read_tables_concurrently(paths: List[str], read_fn) -> list:
+    """Run ``read_fn`` over shard paths on a thread pool, preserving order."""
+    with ThreadPoolExecutor(max_workers=min(MAX_SHARD_WORKERS, len(paths))) as executor:
+        return list(executor.map(read_fn, paths))
+
+
+def load_csv(
+    path: str,
+    schema: Optional[dict] = None,
+    columns: Optional[List[str]] = None,
+    **kwargs,
+) -> pd.DataFrame:
     """
     Load CSV file from local filesystem or S3.
     
     Args:
-        path: Local file path or S3 URI (s3://bucket/key)
+        path: Local file path or S3 URI (s3://bucket/key); a local directory or
+            glob pattern loads every matching CSV shard concurrently
+        schema: Optional read schema with ``dtype`` and ``parse_dates`` entries
+            (see ``src.features.build_read_schema``) so columns are typed at
+            parse time instead of inferred
+        columns: Optional subset of columns to parse; all other columns are
+            skipped by the reader, as are listed columns a file lacks
         **kwargs: Additional arguments passed to pd.read_csv
     
     Returns:
         DataFrame with loaded data
     """
-    log.info(f"Loading CSV from: {path}")
+    log.info("Loading CSV from: {}", path)
     
     if path.startswith("s3://"):
         # TODO: Implement S3 loading with boto3
         raise NotImplementedError("S3 loading not yet implemented. Use local paths.")
     
-    df = pd.read_csv(path, **kwargs)
-    log.info(f"Loaded {len(df)} rows, {len(df.columns)} columns")
+    paths = resolve_paths(path)
+    
+    if schema:
+        kwargs = {**schema, **kwargs}
+    if columns is not None:
+        wanted = set(columns)
+        kwargs["usecols"] = lambda col: col in wanted
+    if len(paths) == 1:
+        df = pd.read_csv(paths[0], **kwargs)
+    else:
+        frames = _read_tables_concurrently(paths, lambda p: pd.read_csv(p, **kwargs))
+        df = pd.concat(frames, ignore_index=True)
+    log.info("Loaded {} rows, {} columns", len(df), len(df.columns))
     
     return df
 
 
-def save_csv(df: pd.DataFrame, path: str, **kwargs) -> None:
+def iter_csv(
+    path: str,
+    chunk_size: int,
+    schema: Optional[dict] = None,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a local CSV as DataFrames of at most ``chunk_size`` rows.
+    
+    Blocks are parsed incrementally with the pyarrow streaming reader, so only
+    the current chunk (plus one parse block) is held in memory. A directory or
+    glob pattern streams its shards in order, parsing up to
+    ``MAX_SHARD_WORKERS`` shards at a time.
+    
+    Args:
+        path: Local file path, directory of CSV shards, or glob pattern
+        chunk_size: Number of rows per yielded DataFrame
+        schema: Optional read schema with a ``dtype`` entry (see ``load_csv``)
+        columns: Optional subset of columns to parse (see ``load_csv``)
+    
+    Yields:
+        DataFrame chunks in file order
+    """
+    log.info("Streaming CSV from: {} ({} rows per chunk)", path, chunk_size)
+    
+    if path.startswith("s3://"):
+        raise NotImplementedError("S3 streaming not yet implemented. Use local paths.")
+    
+    # Re-slice parse blocks (sized in bytes) into fixed row-count chunks
+    pending, pending_rows = [], 0
+    for table in _iter_tables(resolve_paths(path), schema or {}, columns):
+        pending.append(table)
+        pending_rows += table.num_rows
+        while pending_rows >= chunk_size:
+            combined = pa.concat_tables(pending, promote_options="permissive")
+            yield combined.slice(0, chunk_size).to_pandas()
+            rest = combined.slice(chunk_size)
+            pending, pending_rows = [rest], rest.num_rows
+    
+    if pending_rows:
+        yield pa.concat_tables(pending, promote_options="permissive").to_pandas()
+
+
+def _iter_tables(
+    paths: List[str], schema: dict, columns: Optional[List[str]] = None
+) -> Iterator[pa.Table]:
+    """Yield Arrow tables for CSV shards in order, one parse block or shard at a time."""
+    if len(paths) == 1:
+        reader = pacsv.open_csv(
+            paths[0],
+            read_options=pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True),
+            convert_options=_arrow_convert_options(schema, paths[0], columns),
+        )
+        for batch in reader:
+            yield pa.Table.from_batches([batch])
+        return
+    
+    # Many shards: parse a window of them concurrently, then emit in order
+    for start in range(0, len(paths), MAX_SHARD_WORKERS):
+        window = paths[start:start + MAX_SHARD_WORKERS]
+        yield from _read_tables_concurrently(window, lambda p: _read_table_arrow(p, schema, columns))
+
+
+def _csv_buffer(df: pd.DataFrame) -> BytesIO:
+    """Encode a DataFrame as UTF-8 CSV bytes with the multithreaded Arrow writer."""
+    buffer = BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def save_csv(df: pd.DataFrame, path: str, engine: str = "pandas", **kwargs) -> None:
     """
     Save DataFrame to CSV (local or S3).
     
     Args:
         df: DataFrame to save
         path: Local file path or S3 URI
-        **kwargs: Additional arguments passed to df.to_csv
+        engine: "pandas" for df.to_csv, or "pyarrow" to encode with the
+            multithreaded pyarrow.csv writer
+        **kwargs: Additional arguments passed to df.to_csv (pandas engine only)
     """
-    log.info(f"Saving {len(df)} rows to: {path}")
+    log.info("Saving {} rows to: {}", len(df), path)
     
     # Ensure directory exists for local paths
     if not path.startswith("s3://"):
@@ -54,8 +276,13 @@ def save_csv(df: pd.DataFrame, path: str, **kwargs) -> None:
         # TODO: Implement S3 saving with boto3
         raise NotImplementedError("S3 saving not yet implemented. Use local paths.")
     
-    df.to_csv(path, index=False, **kwargs)
-    log.info(f"Saved successfully to {path}")
+    if engine == "pyarrow":
+        if kwargs:
+            raise ValueError(f"pyarrow engine does not accept to_csv arguments: {list(kwargs)}")
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+    else:
+        df.to_csv(path, index=False, **kwargs)
+    log.info("Saved successfully to {}", path)
 
 
 def load_from_s3(bucket: str, key: str) -> pd.DataFrame:
@@ -69,16 +296,15 @@ def load_from_s3(bucket: str, key: str) -> pd.DataFrame:
     Returns:
         DataFrame with loaded data
     """
-    import boto3
-    from io import StringIO
-    
-    log.info(f"Loading from S3: s3://{bucket}/{key}")
+    log.info("Loading from S3: s3://{}/{}", bucket, key)
     
-    s3_client = boto3.client("s3")
-    obj = s3_client.get_object(Bucket=bucket, Key=key)
-    df = pd.read_csv(StringIO(obj["Body"].read().decode("utf-8")))
+    # Objects above the multipart threshold download as parallel ranged GETs
+    buffer = BytesIO()
+    _get_s3_client().download_fileobj(bucket, key, buffer, Config=_s3_transfer_config())
+    buffer.seek(0)
+    df = pd.read_csv(buffer)
     
-    log.info(f"Loaded {len(df)} rows from S3")
+    log.info("Loaded {} rows from S3", len(df))
     return df
 
 
@@ -91,18 +317,13 @@ def save_to_s3(df: pd.DataFrame, bucket: str, key: str) -> None:
         bucket: S3 bucket name
         key: Object key
     """
-    import boto3
-    from io import StringIO
-    
-    log.info(f"Saving to S3: s3://{bucket}/{key}")
+    log.info("Saving to S3: s3://{}/{}", bucket, key)
     
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
+    csv_buffer = _csv_buffer(df)
     
-    s3_client = boto3.client("s3")
-    s3_client.put_object(Bucket=bucket, Key=key, Body=csv_buffer.getvalue())
+    _get_s3_client().put_object(Bucket=bucket, Key=key, Body=csv_buffer)
     
-    log.info(f"Saved {len(df)} rows to S3")
+    log.info("Saved {} rows to S3", len(df))
 
 
 def load_from_minio(endpoint: str, access_key: str, secret_key: str, 
@@ -124,7 +345,7 @@ def load_from_minio(endpoint: str, access_key: str, secret_key: str,
     from minio import Minio
     from io import BytesIO
     
-    log.info(f"Loading from MinIO: {bucket}/{key}")
+    log.info("Loading from MinIO: {}/{}", bucket, key)
     
     client = Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=secure)
     
@@ -133,7 +354,7 @@ def load_from_minio(endpoint: str, access_key: str, secret_key: str,
     response.close()
     response.release_conn()
     
-    log.info(f"Loaded {len(df)} rows from MinIO")
+    log.info("Loaded {} rows from MinIO", len(df))
     return df
 
 
@@ -152,9 +373,8 @@ def save_to_minio(df: pd.DataFrame, endpoint: str, access_key: str, secret_key:
         secure: Use HTTPS
     """
     from minio import Minio
-    from io import BytesIO
     
-    log.info(f"Saving to MinIO: {bucket}/{key}")
+    log.info("Saving to MinIO: {}/{}", bucket, key)
     
     client = Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=secure)
     
@@ -162,7 +382,7 @@ def save_to_minio(df: pd.DataFrame, endpoint: str, access_key: str, secret_key:
     if not client.bucket_exists(bucket):
         client.make_bucket(bucket)
     
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    client.put_object(bucket, key, BytesIO(csv_bytes), length=len(csv_bytes))
+    csv_buffer = _csv_buffer(df)
+    client.put_object(bucket, key, csv_buffer, length=csv_buffer.getbuffer().nbytes)
     
-    log.info(f"Saved {len(df)} rows to MinIO")
+    log.info("Saved {} rows to MinIO", len(df))
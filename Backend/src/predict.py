@@ -2,16 +2,23 @@
 
 import argparse
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
 import joblib
 import numpy as np
+from joblib import parallel_config
 import pandas as pd
+import pyarrow as pa
 from dotenv import load_dotenv
+from scipy import sparse
+from sklearn import config_context
+from sklearn.utils.parallel import Parallel, delayed
 
-from src.features import prepare_features
-from src.io_utils import load_csv, save_csv
+from src.features import build_read_schema, ensure_float32, get_read_columns, prepare_features
+from src.io_utils import iter_csv, save_csv
 from src.telemetry import get_logger, setup_logging
 from src.train import load_config
 
@@ -19,6 +26,112 @@ load_dotenv()
 
 log = get_logger(__name__)
 
+# IForest and LOF score concurrently, so each gets half of the cores
+SCORING_JOBS = max(1, (os.cpu_count() or 1) // 2)
+_SCORING_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="scoring")
+
+# Below this many rows, spreading IForest trees over threads costs more than
+# it saves (sklearn scores sequentially by default for the same reason)
+PARALLEL_SCORE_MIN_ROWS = 1000
+
+# Per-thread scratch arrays for scoring intermediates (see scratch_buffer)
+_SCRATCH = threading.local()
+
+# Features are imputed before they reach the models, so sklearn's per-call
+# finiteness scans are redundant; transforms stay plain ndarrays. sklearn
+# config is thread-local, hence applied per scoring call, not via set_config
+SKLEARN_SCORING_CONFIG = {"assume_finite": True, "transform_output": "default"}
+
+
+class CompiledIForest:
+    """Treelite-compiled IForest exposing sklearn's ``score_samples``."""
+    
+    def __init__(self, lib_path: str, nthread: int):
+        import tl2cgen
+        
+        self._tl2cgen = tl2cgen
+        self.predictor = tl2cgen.Predictor(lib_path, nthread=nthread)
+    
+    def score_samples(self, X) -> np.ndarray:
+        # tl2cgen's CSR path breaks on numpy 2, so feed dense rows
+        if sparse.issparse(X):
+            X = X.toarray()
+        # The compiled forest emits the anomaly score, the negated score_samples
+        scores = self.predictor.predict(self._tl2cgen.DMatrix(X)).reshape(-1)
+        return np.negative(scores, out=scores)
+
+
+def scratch_buffer(name: str, n: int, dtype) -> np.ndarray:
+    """
+    Return a length-``n`` view of a reusable per-thread buffer.
+    
+    Only for intermediates that never leave the call: the next call on the
+    same thread overwrites the buffer, so arrays that are returned or stored
+    must still be freshly allocated.
+    
+    Args:
+        name: Buffer key
+        n: Number of elements needed
+        dtype: Buffer dtype
+    
+    Returns:
+        Uninitialized array view of length ``n``
+    """
+    buf = getattr(_SCRATCH, name, None)
+    if buf is None or buf.shape[0] < n or buf.dtype != dtype:
+        buf = np.empty(max(n, 4096), dtype=dtype)
+        setattr(_SCRATCH, name, buf)
+    return buf[:n]
+
+
+def iforest_score_samples(model, X) -> np.ndarray:
+    """
+    Call ``model.score_samples``, spreading trees over threads for large batches.
+    
+    sklearn's IForest ignores ``n_jobs`` when scoring and only follows the
+    active joblib context, which is thread-local, so it is set per call.
+    
+    Args:
+        model: Fitted IsolationForest (or CompiledIForest)
+        X: Feature matrix
+    
+    Returns:
+        score_samples output (lower = more anomalous)
+    """
+    if X.shape[0] < PARALLEL_SCORE_MIN_ROWS:
+        return model.score_samples(X)
+    with parallel_config(backend="threading", n_jobs=SCORING_JOBS):
+        return model.score_samples(X)
+
+
+def load_compiled_iforest(config: dict, model_path: Path):
+    """
+    Load the compiled IForest library if it exists and is up to date.
+    
+    Args:
+        config: Configuration dictionary
+        model_path: Path of the sklearn IForest artifact
+    
+    Returns:
+        CompiledIForest, or None to fall back to the sklearn model
+    """
+    lib_name = config["artifacts"].get("iforest_lib")
+    if not lib_name:
+        return None
+    
+    lib_path = Path(config["artifacts"]["dir"]) / lib_name
+    if not lib_path.exists():
+        return None
+    if lib_path.stat().st_mtime_ns < model_path.stat().st_mtime_ns:
+        log.warning("Compiled IForest {} is older than {}; using sklearn model", lib_path, model_path)
+        return None
+    
+    try:
+        return CompiledIForest(str(lib_path), nthread=SCORING_JOBS)
+    except ImportError:
+        log.warning("tl2cgen not installed; using sklearn IForest")
+        return None
+
 
 def load_artifacts(config: dict, model_name: str = None) -> dict:
     """
@@ -33,11 +146,12 @@ def load_artifacts(config: dict, model_name: str = None) -> dict:
     """
     artifacts_dir = config["artifacts"]["dir"]
     
-    log.info(f"Loading artifacts from: {artifacts_dir}")
+    log.info("Loading artifacts from: {}", artifacts_dir)
     
-    # Load shared preprocessor
+    # Load shared preprocessor; large numpy buffers in the preprocessor and
+    # models are memory-mapped and shared between processes
     preprocessor_path = Path(artifacts_dir) / config["artifacts"]["preprocessor"]
-    preprocessor = joblib.load(preprocessor_path)
+    preprocessor = joblib.load(preprocessor_path, mmap_mode="r")
     
     # Determine which models to load
     if model_name:
@@ -56,15 +170,16 @@ def load_artifacts(config: dict, model_name: str = None) -> dict:
     meta_template = config["artifacts"]["meta_template"]
     
     for name in models_to_load:
-        # Load model
+        # Load model, preferring the compiled IForest library when present
         model_path = Path(artifacts_dir) / model_template.format(name=name)
-        models[name] = joblib.load(model_path)
+        compiled = load_compiled_iforest(config, model_path) if name == "iforest" else None
+        models[name] = compiled or joblib.load(model_path, mmap_mode="r")
         
         # Load metadata
         meta_path = Path(artifacts_dir) / meta_template.format(name=name)
         metadata[name] = joblib.load(meta_path)
     
-    log.info(f"Loaded models: {list(models.keys())}")
+    log.info("Loaded models: {}", list(models.keys()))
     
     return {
         "preprocessor": preprocessor,
@@ -73,105 +188,190 @@ def load_artifacts(config: dict, model_name: str = None) -> dict:
     }
 
 
-def predict_batch(config: dict, artifacts: dict, model_selection: str = "ensemble") -> pd.DataFrame:
+def _score_rows_parallel(score_fn, X, n_chunks: int = None) -> np.ndarray:
     """
-    Run batch prediction on inference data returning all model results.
+    Apply a row-wise scoring function to row blocks of X on a thread pool.
+    
+    The kNN queries behind LOF scoring run in sklearn's compiled code and
+    release the GIL, so threads scale across cores without copying X.
     
     Args:
-        config: Configuration dictionary
-        artifacts: Dictionary with preprocessor, models, and metadata
-        model_selection: Legacy parameter, now always returns all models
+        score_fn: Function mapping a row block of X to a 1-D score array
+        X: Feature matrix (dense or sparse)
+        n_chunks: Number of row blocks (defaults to the CPU count)
     
     Returns:
-        DataFrame with 7 columns: interaction_id, iforest_score, iforest_anomaly, 
-        lof_score, lof_anomaly, ensemble_score, ensemble_anomaly
+        Scores for all rows of X, in order
     """
-    # Load inference data
-    inference_path = config["data"]["inference_path"]
-    log.info(f"Loading inference data from: {inference_path}")
-    df = load_csv(inference_path)
+    n_chunks = min(n_chunks or os.cpu_count() or 1, X.shape[0])
+    if n_chunks <= 1:
+        return score_fn(X)
+    
+    bounds = np.linspace(0, X.shape[0], n_chunks + 1, dtype=int)
+    parts = Parallel(n_jobs=n_chunks, prefer="threads")(
+        delayed(score_fn)(X[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])
+    )
+    return np.concatenate(parts)
+
+
+def _with_scoring_config(fn, *args):
+    """Call ``fn`` under the scoring sklearn config (for pool threads)."""
+    with config_context(**SKLEARN_SCORING_CONFIG):
+        return fn(*args)
+
+
+def _min_max_normalize(scores: np.ndarray, score_stats: dict, out: np.ndarray = None) -> np.ndarray:
+    """
+    Scale scores to [0, 1] using training min/max, without temporaries.
     
-    log.info(f"Loaded {len(df)} records for scoring")
+    Args:
+        scores: Raw anomaly scores (left unmodified)
+        score_stats: Training score stats with ``min`` and ``max``
+        out: Optional buffer to write into (a new array by default)
     
-    # Ensure we have both required models
-    required_models = {"iforest", "lof"}
-    available_models = set(artifacts["models"].keys())
-    if not required_models.issubset(available_models):
-        missing = required_models - available_models
-        raise ValueError(f"Required models not available: {missing}")
+    Returns:
+        Normalized scores, clipped to [0, 1]
+    """
+    lo, hi = score_stats["min"], score_stats["max"]
+    normalized = np.subtract(scores, lo, out=out)
+    normalized /= hi - lo + 1e-10
+    return np.clip(normalized, 0, 1, out=normalized)
+
+
+def score_chunk(df: pd.DataFrame, config: dict, artifacts: dict) -> dict:
+    """
+    Score one block of inference records with IForest, LOF and the ensemble.
     
-    # Prepare features (preserve identifiers)
+    Args:
+        df: Inference records (one chunk of the input file)
+        config: Configuration dictionary
+        artifacts: Dictionary with preprocessor, models, and metadata
+    
+    Returns:
+        Dict of output column name to array, in output column order
+    """
+    # Prepare features (preserve identifiers) and transform
     feature_df, identifier_cols = prepare_features(df, config["features"], is_training=False)
+    with config_context(**SKLEARN_SCORING_CONFIG):
+        X = ensure_float32(artifacts["preprocessor"].transform(feature_df))
     
-    # Transform features
-    log.info("Transforming features...")
-    X = artifacts["preprocessor"].transform(feature_df)
+    # One preallocated block holds the IForest, LOF and ensemble masks; the
+    # comparisons below write straight into its rows
+    iforest_anomalies, lof_anomalies, ensemble_anomalies = np.empty((3, X.shape[0]), dtype=bool)
     
-    # Score with IForest
-    log.info("Computing IForest scores...")
+    # Score with IForest and LOF concurrently; both release the GIL in
+    # compiled code and read the same X
     iforest_model = artifacts["models"]["iforest"]
+    lof_model = artifacts["models"]["lof"]
+    iforest_future = _SCORING_POOL.submit(_with_scoring_config, iforest_score_samples, iforest_model, X)
+    lof_future = _SCORING_POOL.submit(
+        _with_scoring_config, _score_rows_parallel, lof_model.detector_.score_samples, X, SCORING_JOBS
+    )
+    iforest_scores = np.negative(iforest_future.result())
+    lof_scores = np.negative(lof_future.result())
+    
     iforest_metadata = artifacts["metadata"]["iforest"]
     iforest_threshold = iforest_metadata["threshold"]
-    iforest_scores = -iforest_model.score_samples(X)
-    iforest_anomalies = iforest_scores >= iforest_threshold
-    
-    log.info(f"IForest - Detected {iforest_anomalies.sum()} anomalies "
-             f"({100 * iforest_anomalies.mean():.2f}%)")
+    np.greater_equal(iforest_scores, iforest_threshold, out=iforest_anomalies)
     
-    # Score with LOF
-    log.info("Computing LOF scores...")
-    lof_model = artifacts["models"]["lof"]
     lof_metadata = artifacts["metadata"]["lof"]
     lof_threshold = lof_metadata["threshold"]
-    lof_scores = -lof_model.detector_.score_samples(X)
-    lof_anomalies = lof_scores >= lof_threshold
-    
-    log.info(f"LOF - Detected {lof_anomalies.sum()} anomalies "
-             f"({100 * lof_anomalies.mean():.2f}%)")
+    np.greater_equal(lof_scores, lof_threshold, out=lof_anomalies)
     
     # Compute ensemble score (normalized weighted average)
-    log.info("Computing ensemble scores...")
     ensemble_config = config["ensemble"]
     weights = ensemble_config["weights"]
     iforest_weight = weights.get("iforest", 0.5)
     lof_weight = weights.get("lof", 0.5)
     
-    # Normalize scores to [0, 1] range using training stats
-    iforest_min = iforest_metadata["score_stats"]["min"]
-    iforest_max = iforest_metadata["score_stats"]["max"]
-    iforest_normalized = (iforest_scores - iforest_min) / (iforest_max - iforest_min + 1e-10)
-    iforest_normalized = np.clip(iforest_normalized, 0, 1)
-    
-    lof_min = lof_metadata["score_stats"]["min"]
-    lof_max = lof_metadata["score_stats"]["max"]
-    lof_normalized = (lof_scores - lof_min) / (lof_max - lof_min + 1e-10)
-    lof_normalized = np.clip(lof_normalized, 0, 1)
+    # Normalize scores to [0, 1] range using training stats; each
+    # normalization works in place on a single copy of the raw scores. The
+    # LOF term is only an addend, so it reuses this thread's scratch buffer
+    iforest_normalized = _min_max_normalize(iforest_scores, iforest_metadata["score_stats"])
+    lof_normalized = _min_max_normalize(
+        lof_scores,
+        lof_metadata["score_stats"],
+        out=scratch_buffer("lof_normalized", lof_scores.shape[0], lof_scores.dtype),
+    )
     
-    # Weighted average
-    ensemble_scores = iforest_weight * iforest_normalized + lof_weight * lof_normalized
+    # Weighted average, accumulated into the IForest buffer
+    ensemble_scores = np.multiply(iforest_normalized, iforest_weight, out=iforest_normalized)
+    lof_normalized *= lof_weight
+    ensemble_scores += lof_normalized
     
     # Ensemble anomaly: OR of individual model anomalies
-    ensemble_anomalies = np.logical_or(iforest_anomalies, lof_anomalies)
+    np.logical_or(iforest_anomalies, lof_anomalies, out=ensemble_anomalies)
     
-    log.info(f"Ensemble - Detected {ensemble_anomalies.sum()} anomalies "
-             f"({100 * ensemble_anomalies.mean():.2f}%)")
-    
-    # Build results DataFrame with 7 required columns
+    # Build results with 7 required columns; flags are 0/1 uint8 views of the masks
     results = {
-        "interaction_id": df["interaction_id"].values,
+        "interaction_id": df["interaction_id"].to_numpy(),
         "iforest_score": iforest_scores,
-        "iforest_anomaly": iforest_anomalies,
+        "iforest_anomaly": iforest_anomalies.view(np.uint8),
         "lof_score": lof_scores,
-        "lof_anomaly": lof_anomalies,
+        "lof_anomaly": lof_anomalies.view(np.uint8),
         "ensemble_score": ensemble_scores,
-        "ensemble_anomaly": ensemble_anomalies,
+        "ensemble_anomaly": ensemble_anomalies.view(np.uint8),
     }
     
     # Add timestamp if present
     if "timestamp" in df.columns:
-        results = {"timestamp": df["timestamp"].values, **results}
+        results = {"timestamp": df["timestamp"].to_numpy(), **results}
+    
+    return results
+
+
+def predict_batch(config: dict, artifacts: dict, model_selection: str = "ensemble") -> pd.DataFrame:
+    """
+    Run batch prediction on inference data returning all model results.
+    
+    The input is streamed in ``batch.chunk_size`` row chunks, each scored
+    independently, so only one chunk's features are in memory at a time.
+    
+    Args:
+        config: Configuration dictionary
+        artifacts: Dictionary with preprocessor, models, and metadata
+        model_selection: Legacy parameter, now always returns all models
     
-    results_df = pd.DataFrame(results)
+    Returns:
+        DataFrame with 7 columns: interaction_id, iforest_score, iforest_anomaly, 
+        lof_score, lof_anomaly, ensemble_score, ensemble_anomaly
+        (anomaly flags are 0/1 uint8)
+    """
+    # Ensure we have both required models
+    required_models = {"iforest", "lof"}
+    available_models = set(artifacts["models"].keys())
+    if not required_models.issubset(available_models):
+        missing = required_models - available_models
+        raise ValueError(f"Required models not available: {missing}")
+    
+    # Stream and score inference data chunk by chunk
+    inference_path = config["data"]["inference_path"]
+    chunk_size = config["batch"]["chunk_size"]
+    log.info("Scoring inference data from: {}", inference_path)
+    
+    chunks = iter_csv(
+        inference_path,
+        chunk_size,
+        schema=build_read_schema(config["features"], parse_dates=False),
+        columns=get_read_columns(config["features"]),
+    )
+    chunk_results = [score_chunk(chunk, config, artifacts) for chunk in chunks]
+    if not chunk_results:
+        raise ValueError(f"No records found in {inference_path}")
+    
+    # Assemble as an Arrow table and hand its buffers to pandas column by column
+    results_table = pa.table({
+        col: np.concatenate([part[col] for part in chunk_results])
+        for col in chunk_results[0]
+    })
+    results_df = results_table.to_pandas(split_blocks=True, self_destruct=True)
+    del results_table
+    
+    log.info("Scored {} records in {} chunk(s)", len(results_df), len(chunk_results))
+    for name in ("iforest", "lof", "ensemble"):
+        anomalies = results_df[f"{name}_anomaly"]
+        log.info("{} - Detected {} anomalies ({:.2f}%)",
+                 name, anomalies.sum(), 100 * anomalies.mean())
     
     return results_df
 
@@ -192,8 +392,8 @@ def save_predictions(results_df: pd.DataFrame, config: dict, model_selection: st
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     output_path = Path(output_dir) / f"anomalies_{model_selection}_{timestamp}.csv"
     
-    log.info(f"Saving predictions to: {output_path}")
-    save_csv(results_df, str(output_path))
+    log.info("Saving predictions to: {}", output_path)
+    save_csv(results_df, str(output_path), engine="pyarrow")
     
     return str(output_path)
 
@@ -233,7 +433,7 @@ def main():
     
     log.info("=" * 60)
     log.info("Starting Batch Anomaly Scoring")
-    log.info(f"Model selection: {args.model}")
+    log.info("Model selection: {}", args.model)
     log.info("=" * 60)
     
     try:
@@ -258,11 +458,11 @@ def main():
         
         log.info("=" * 60)
         log.info("Batch scoring completed successfully!")
-        log.info(f"Results saved to: {output_path}")
+        log.info("Results saved to: {}", output_path)
         log.info("=" * 60)
         
     except Exception as e:
-        log.error(f"Batch scoring failed with error: {e}")
+        log.error("Batch scoring failed with error: {}", e)
         raise
 
 
@@ -2,12 +2,13 @@
 
 import os
 from datetime import datetime
+from pathlib import Path
 
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 from dotenv import load_dotenv
 
-from src.alerts import send_anomaly_alert
+from src.alerts import send_anomaly_alert, smtp_session
 from src.predict import load_artifacts, predict_batch, save_predictions
 from src.telemetry import get_logger, setup_logging
 from src.train import load_config
@@ -16,48 +17,110 @@ load_dotenv()
 
 log = get_logger(__name__)
 
+# Artifacts loaded by a previous run, keyed by the artifact files' mtimes
+_artifact_cache = {
+    "key": None,
+    "artifacts": None,
+}
+
+
+def _artifact_cache_key(config: dict) -> tuple:
+    """
+    Build a cache key from the artifact paths and their modification times.
+    
+    Args:
+        config: Configuration dictionary
+    
+    Returns:
+        Tuple of (path, mtime) for the preprocessor and every model/metadata file,
+        plus the compiled IForest library when configured (mtime None while it
+        does not exist, so compiling or removing it also changes the key)
+    """
+    artifacts_config = config["artifacts"]
+    artifacts_dir = Path(artifacts_config["dir"])
+    
+    paths = [artifacts_dir / artifacts_config["preprocessor"]]
+    for model_config in config["models"]:
+        name = model_config["name"]
+        paths.append(artifacts_dir / artifacts_config["model_template"].format(name=name))
+        paths.append(artifacts_dir / artifacts_config["meta_template"].format(name=name))
+    
+    key = [(str(path), path.stat().st_mtime_ns) for path in paths]
+    
+    lib_name = artifacts_config.get("iforest_lib")
+    if lib_name:
+        lib_path = artifacts_dir / lib_name
+        key.append((str(lib_path), lib_path.stat().st_mtime_ns if lib_path.exists() else None))
+    
+    return tuple(key)
+
+
+def get_cached_artifacts(config: dict) -> dict:
+    """
+    Load model artifacts once and reuse them until the files change on disk.
+    
+    Args:
+        config: Configuration dictionary
+    
+    Returns:
+        Dictionary with preprocessor, models, and metadata
+    """
+    key = _artifact_cache_key(config)
+    
+    if _artifact_cache["key"] != key:
+        log.info("Loading model artifacts (first run or artifacts changed)")
+        _artifact_cache["artifacts"] = load_artifacts(config)
+        _artifact_cache["key"] = key
+    else:
+        log.info("Reusing cached model artifacts")
+    
+    return _artifact_cache["artifacts"]
+
 
 def run_batch_scoring_job():
     """
     Execute batch scoring job and send alerts if anomalies detected.
     """
     log.info("=" * 60)
-    log.info(f"Starting scheduled batch scoring job at {datetime.utcnow().isoformat()}")
+    log.info("Starting scheduled batch scoring job at {}", datetime.utcnow().isoformat())
     log.info("=" * 60)
     
     try:
         # Load configuration
         config = load_config()
         
-        # Load model artifacts
-        preprocessor, model, metadata = load_artifacts(config)
+        # Load model artifacts (cached across runs)
+        artifacts = get_cached_artifacts(config)
         
         # Run batch predictions
-        results_df = predict_batch(config, preprocessor, model, metadata)
+        results_df = predict_batch(config, artifacts)
         
         # Save results
         output_path = save_predictions(results_df, config)
         
-        # Count anomalies
-        num_anomalies = results_df["is_anomaly"].sum()
+        # Count anomalies (ensemble flags; there is no single ensemble threshold)
+        num_anomalies = int(results_df["ensemble_anomaly"].sum())
         total_records = len(results_df)
-        threshold = metadata["threshold"]
+        threshold = None
         
-        log.info(f"Batch job completed: {num_anomalies} anomalies in {total_records} records")
+        log.info("Batch job completed: {} anomalies in {} records", num_anomalies, total_records)
         
         # Send alert if anomalies detected
         if num_anomalies > 0:
-            send_anomaly_alert(
-                num_anomalies=num_anomalies,
-                total_records=total_records,
-                output_path=output_path,
-                threshold=threshold,
-            )
+            # One SMTP login for the run's emails, closed once they are sent
+            with smtp_session() as smtp_client:
+                send_anomaly_alert(
+                    num_anomalies=num_anomalies,
+                    total_records=total_records,
+                    output_path=output_path,
+                    threshold=threshold,
+                    smtp_client=smtp_client,
+                )
         
         log.info("Batch scoring job completed successfully")
         
     except Exception as e:
-        log.error(f"Batch scoring job failed: {e}")
+        log.error("Batch scoring job failed: {}", e)
         # Optionally send failure alert
         error_message = f"🔴 Batch Scoring Job Failed\n\nError: {str(e)}"
         try:
@@ -84,7 +147,7 @@ def start_scheduler():
     log.info("=" * 60)
     log.info("Starting CX Anomaly Detection Scheduler")
     log.info("=" * 60)
-    log.info(f"Batch scoring schedule (cron): {cron_expr}")
+    log.info("Batch scoring schedule (cron): {}", cron_expr)
     
     # Create scheduler
     scheduler = BlockingScheduler()
@@ -93,7 +156,7 @@ def start_scheduler():
     # Cron format: minute hour day month day_of_week
     parts = cron_expr.split()
     if len(parts) != 5:
-        log.error(f"Invalid cron expression: {cron_expr}")
+        log.error("Invalid cron expression: {}", cron_expr)
         return
     
     trigger = CronTrigger(
@@ -3,12 +3,31 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator
 
 
 class InteractionRecord(BaseModel):
     """Schema for a single CX interaction record."""
 
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
+            "example": {
+                "interaction_id": "abc-123",
+                "timestamp": "2025-10-15T10:00:00Z",
+                "csat": 3.2,
+                "ies": 64.0,
+                "complaints": 1,
+                "aht_seconds": 420.0,
+                "hold_time_seconds": 60.0,
+                "transfers": 0,
+                "channel": "voice",
+                "language": "en",
+                "queue": "billing",
+            }
+        },
+    )
+
     interaction_id: str = Field(..., description="Unique interaction identifier")
     timestamp: datetime = Field(..., description="Interaction timestamp")
     csat: Optional[float] = Field(None, ge=1.0, le=5.0, description="Customer satisfaction score")
@@ -23,40 +42,21 @@ class InteractionRecord(BaseModel):
     language: Optional[str] = Field(None, description="Language code")
     queue: Optional[str] = Field(None, description="Queue name")
 
-    @field_validator("timestamp", mode="before")
+    @field_validator("timestamp", mode="wrap")
     @classmethod
-    def parse_timestamp(cls, v):
-        """Parse timestamp from various formats."""
-        if isinstance(v, str):
-            # Try ISO format first
-            try:
-                return datetime.fromisoformat(v.replace("Z", "+00:00"))
-            except ValueError:
-                # Try common formats
-                for fmt in ["%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"]:
-                    try:
-                        return datetime.strptime(v, fmt)
-                    except ValueError:
-                        continue
-                raise ValueError(f"Unable to parse timestamp: {v}")
-        return v
-
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "interaction_id": "abc-123",
-                "timestamp": "2025-10-15T10:00:00Z",
-                "csat": 3.2,
-                "ies": 64.0,
-                "complaints": 1,
-                "aht_seconds": 420.0,
-                "hold_time_seconds": 60.0,
-                "transfers": 0,
-                "channel": "voice",
-                "language": "en",
-                "queue": "billing",
-            }
-        }
+    def parse_timestamp(cls, v, handler):
+        """Parse timestamp natively, falling back to Python's ISO parser."""
+        # pydantic-core handles ISO 8601 (incl. 'Z' and space separators) and epochs
+        try:
+            return handler(v)
+        except ValidationError:
+            if isinstance(v, str):
+                # Fallback for ISO variants only Python accepts, e.g. basic format
+                try:
+                    return datetime.fromisoformat(v.replace("Z", "+00:00"))
+                except ValueError:
+                    pass
+            raise ValueError(f"Unable to parse timestamp: {v}")
 
 
 class AnomalyScore(BaseModel):
@@ -66,14 +66,15 @@ class AnomalyScore(BaseModel):
     scores: dict[str, float] = Field(..., description="Model scores (higher = more anomalous)")
     is_anomaly: dict[str, int] = Field(..., description="Anomaly flags per model (1=anomaly, 0=normal)")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "interaction_id": "abc-123",
                 "scores": {"iforest": 0.85, "rcf": 0.78},
                 "is_anomaly": {"iforest": 1, "rcf": 0, "ensemble": 1},
             }
         }
+    )
 
 
 class BatchScoreRequest(BaseModel):
@@ -82,6 +83,10 @@ class BatchScoreRequest(BaseModel):
     records: list[InteractionRecord]
 
 
+# Compiled validator for a list of records; validates a whole batch in one call
+INTERACTION_RECORDS_ADAPTER = TypeAdapter(list[InteractionRecord])
+
+
 class BatchScoreResponse(BaseModel):
     """Response schema for batch scoring."""
 
@@ -91,6 +96,17 @@ class BatchScoreResponse(BaseModel):
     processing_time_ms: float
 
 
+class ColumnarScoreResponse(BaseModel):
+    """Column-oriented batch scoring response (``/score?format=columnar``)."""
+
+    interaction_ids: list[str]
+    scores: dict[str, list[float]] = Field(..., description="Per-model score arrays aligned with interaction_ids")
+    is_anomaly: dict[str, list[int]] = Field(..., description="Per-model 0/1 flag arrays aligned with interaction_ids")
+    total_records: int
+    anomalies_detected: int
+    processing_time_ms: float
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
 
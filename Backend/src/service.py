@@ -1,24 +1,39 @@
 """FastAPI service for real-time anomaly scoring with multi-model support."""
 
+import asyncio
+import copy
+import json
+import operator
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import joblib
 import numpy as np
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import pandas as pd
+from pydantic import ValidationError
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
 
 from src import __version__
-from src.features import prepare_features
+from src.features import ensure_float32, prepare_features
+from src.predict import iforest_score_samples, load_compiled_iforest, scratch_buffer
 from src.schema import (
+    INTERACTION_RECORDS_ADAPTER,
     AnomalyScore,
     BatchScoreResponse,
+    ColumnarScoreResponse,
     HealthResponse,
     InteractionRecord,
 )
@@ -53,9 +68,27 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Global state for model artifacts
+# Micro-batching: concurrent /score requests arriving within this window are
+# scored together in one preprocessor/model pass (0 disables batching)
+SCORE_BATCH_WINDOW_MS = float(os.getenv("SCORE_BATCH_WINDOW_MS", "0"))
+SCORE_BATCH_MAX_RECORDS = int(os.getenv("SCORE_BATCH_MAX_RECORDS", "4096"))
+
+# Records per model pass on the streaming /score/batch endpoint
+SCORE_STREAM_CHUNK_SIZE = int(os.getenv("SCORE_STREAM_CHUNK_SIZE", "4096"))
+# Longest accepted /score/batch line; a longer one ends the stream with an error
+SCORE_STREAM_MAX_LINE_BYTES = int(os.getenv("SCORE_STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+
+# IForest and LOF score side by side when both are requested
+_SCORING_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="scoring")
+
+# Global state for model artifacts. Each load publishes a new dict by
+# rebinding this name and never mutates it afterwards; scoring takes one
+# reference up front, so every pass sees a single consistent set of artifacts
 _model_state = {
     "preprocessor": None,
+    "transform_plan": None,
+    "norm": None,
+    "lof_score_samples": None,
     "models": {},
     "metadata": {},
     "loaded_at": None,
@@ -63,80 +96,252 @@ _model_state = {
 }
 
 
+def _without_feature_names(transformer):
+    """
+    Copy a fitted sub-transformer so it takes plain arrays without warning.
+    
+    The record fast path feeds arrays to transformers fitted on DataFrames,
+    which sklearn flags as missing feature names. Only the copy loses
+    ``feature_names_in_``; the preprocessor itself keeps checking names.
+    
+    Args:
+        transformer: Fitted transformer or Pipeline
+    
+    Returns:
+        Deep copy with ``feature_names_in_`` removed from every step
+    """
+    transformer = copy.deepcopy(transformer)
+    steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+    for step in steps:
+        if "feature_names_in_" in vars(step):
+            del step.feature_names_in_
+    return transformer
+
+
+def _build_transform_plan(preprocessor, config: dict) -> Optional[list]:
+    """
+    Capture the fitted sub-transformers of the preprocessor for direct use.
+    
+    Args:
+        preprocessor: Fitted preprocessor
+        config: Configuration dictionary
+    
+    Returns:
+        List of (transformer, column getter, n_columns, dtype) in output column
+        order, or None if the preprocessor is not a ColumnTransformer this fast
+        path supports
+    """
+    if not isinstance(preprocessor, ColumnTransformer) or not hasattr(preprocessor, "transformers_"):
+        return None
+    
+    numeric_cols = set(config["features"].get("numeric", []))
+    plan = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or len(columns) == 0:
+            continue
+        if transformer == "passthrough":
+            return None
+        # Numerics are modeled as float32 (as prepare_features casts them);
+        # categoricals stay Python objects for the imputer and encoder
+        dtype = np.float32 if set(columns) <= numeric_cols else object
+        plan.append((_without_feature_names(transformer), operator.attrgetter(*columns), len(columns), dtype))
+    return plan
+
+
+def _build_ensemble_norm(metadata: dict, config: dict) -> Optional[dict]:
+    """
+    Precompute the ensemble's per-model normalization constants.
+    
+    Args:
+        metadata: Model name to training metadata (with ``score_stats``)
+        config: Configuration dictionary
+    
+    Returns:
+        Dict of model name to (min, 1 / range, weight), or None when the
+        ensemble models are not loaded
+    """
+    if not {"iforest", "lof"} <= set(metadata):
+        return None
+    
+    weights = config["ensemble"]["weights"]
+    norm = {}
+    for name in ("iforest", "lof"):
+        stats = metadata[name]["score_stats"]
+        scale = 1.0 / (stats["max"] - stats["min"] + 1e-10)
+        norm[name] = (stats["min"], scale, weights.get(name, 0.5))
+    return norm
+
+
+def _build_lof_score_samples(lof_model, n_canary: int = 64):
+    """
+    Build a LOF ``score_samples`` that queries the neighbors directly.
+    
+    Computes the LOF ratio from the detector's cached fit attributes
+    (``_lrd``, the k-distances of the fitted points) around a single
+    ``kneighbors`` call, skipping ``score_samples``' fitted and input checks
+    and fancy-indexing the k-distance column per call. The result is checked
+    against ``score_samples`` on canary rows of the fitted data.
+    
+    Args:
+        lof_model: Fitted PyOD LOF model
+        n_canary: Number of fitted rows used for the parity check
+    
+    Returns:
+        Scoring function, or None to use ``detector_.score_samples``
+    """
+    detector = lof_model.detector_
+    try:
+        k = detector.n_neighbors_
+        fit_lrd = detector._lrd
+        fit_k_distance = np.ascontiguousarray(detector._distances_fit_X_[:, k - 1])
+        canary = ensure_float32(detector._fit_X[:n_canary])
+    except AttributeError as e:
+        log.warning(f"LOF direct scoring unavailable ({e}); using score_samples")
+        return None
+    
+    def score_samples(X) -> np.ndarray:
+        distances, indices = detector.kneighbors(X, n_neighbors=k)
+        distances = distances.astype(X.dtype, copy=False)
+        # Local reachability density of X, then the mean density ratio of its neighbors
+        reach_distances = np.maximum(distances, fit_k_distance[indices])
+        lrd = 1.0 / (reach_distances.mean(axis=1) + 1e-10)
+        return -(fit_lrd[indices] / lrd[:, np.newaxis]).mean(axis=1)
+    
+    if not np.allclose(score_samples(canary), detector.score_samples(canary), rtol=1e-6, atol=0):
+        log.warning("LOF direct scoring disagrees with score_samples on canary rows; using score_samples")
+        return None
+    
+    return score_samples
+
+
+def _transform_records(records: List[InteractionRecord], plan: list, sparse_output: bool):
+    """
+    Transform records with the fitted sub-transformers, bypassing pandas.
+    
+    Args:
+        records: List of interaction records
+        plan: Transform plan from ``_build_transform_plan``
+        sparse_output: Whether the fitted ColumnTransformer emits CSR output
+    
+    Returns:
+        Feature matrix identical to ``preprocessor.transform`` on the records
+    """
+    parts = []
+    for transformer, get_columns, n_columns, dtype in plan:
+        # attrgetter reads all of a record's columns in one C call (None -> NaN
+        # for float32); a single column comes back as a scalar, hence reshape
+        values = np.array([get_columns(record) for record in records], dtype=dtype)
+        values = values.reshape(len(records), n_columns)
+        if dtype is object:
+            # Missing categoricals must be NaN for the imputer to fill them
+            values[np.equal(values, None)] = np.nan
+        parts.append(transformer.transform(values))
+    
+    if sparse_output:
+        return sparse.hstack(parts, format="csr")
+    return np.hstack([part.toarray() if sparse.issparse(part) else part for part in parts])
+
+
+def _load_model(config: dict, model_name: str, model_path: Path):
+    """Load a model artifact, preferring the compiled IForest library when present."""
+    compiled = load_compiled_iforest(config, model_path) if model_name == "iforest" else None
+    if compiled is not None:
+        log.info(f"Using compiled IForest library for {model_name}")
+        return compiled
+    return joblib.load(model_path, mmap_mode="r")
+
+
 def load_model_artifacts():
-    """Load all model artifacts into memory."""
+    """
+    Load all model artifacts into memory.
+    
+    Artifacts are loaded into locals and published as a new ``_model_state``
+    dict in one assignment. ``_score_frame`` reads that global once per pass,
+    so a reload on the threadpool never mixes old and new artifacts (e.g. a
+    new preprocessor feeding an old model) in a request scored concurrently.
+    """
+    global _model_state
+    
     try:
         config = load_config()
         artifacts_dir = config["artifacts"]["dir"]
         
         log.info(f"Loading model artifacts from: {artifacts_dir}")
         
-        # Load shared preprocessor
-        preprocessor_path = Path(artifacts_dir) / config["artifacts"]["preprocessor"]
-        _model_state["preprocessor"] = joblib.load(preprocessor_path)
-        
-        # Load each model and its metadata
+        # Shared preprocessor plus each model and its metadata. LOF's fitted
+        # training matrix (by far the largest buffer) and the preprocessor's
+        # numeric arrays come back memory-mapped, so uvicorn workers share
+        # those pages. IForest tree nodes do not: sklearn's Tree unpickling
+        # copies them into each process
         model_template = config["artifacts"]["model_template"]
         meta_template = config["artifacts"]["meta_template"]
+        model_names = [model_config["name"] for model_config in config["models"]]
+        preprocessor_path = Path(artifacts_dir) / config["artifacts"]["preprocessor"]
+        model_paths = [Path(artifacts_dir) / model_template.format(name=name) for name in model_names]
+        meta_paths = [Path(artifacts_dir) / meta_template.format(name=name) for name in model_names]
         
-        for model_config in config["models"]:
-            model_name = model_config["name"]
-            
-            # Load model
-            model_path = Path(artifacts_dir) / model_template.format(name=model_name)
-            _model_state["models"][model_name] = joblib.load(model_path)
-            
-            # Load metadata
-            meta_path = Path(artifacts_dir) / meta_template.format(name=model_name)
-            _model_state["metadata"][model_name] = joblib.load(meta_path)
+        # Load the artifacts concurrently so their disk reads overlap (file I/O
+        # releases the GIL; only the unpickling itself is serialized)
+        with ThreadPoolExecutor(max_workers=1 + len(model_names), thread_name_prefix="artifacts") as pool:
+            preprocessor_future = pool.submit(joblib.load, preprocessor_path, mmap_mode="r")
+            model_futures = [
+                pool.submit(_load_model, config, name, path) for name, path in zip(model_names, model_paths)
+            ]
+            meta_futures = [pool.submit(joblib.load, path) for path in meta_paths]
         
-        _model_state["loaded_at"] = datetime.now(timezone.utc)
-        _model_state["config"] = config
+        preprocessor = preprocessor_future.result()
+        models = {name: future.result() for name, future in zip(model_names, model_futures)}
+        metadata = {name: future.result() for name, future in zip(model_names, meta_futures)}
         
-        log.info(f"Model artifacts loaded successfully for models: {list(_model_state['models'].keys())}")
+        _model_state = {
+            "preprocessor": preprocessor,
+            "transform_plan": _build_transform_plan(preprocessor, config),
+            "norm": _build_ensemble_norm(metadata, config),
+            "lof_score_samples": _build_lof_score_samples(models["lof"]) if "lof" in models else None,
+            "models": models,
+            "metadata": metadata,
+            "loaded_at": datetime.now(timezone.utc),
+            "config": config,
+        }
+        
+        log.info(f"Model artifacts loaded successfully for models: {list(models.keys())}")
         
     except Exception as e:
         log.error(f"Failed to load model artifacts: {e}")
         raise
 
 
-def score_records(records: List[InteractionRecord], model_selection: str = "both") -> List[AnomalyScore]:
+_VALID_MODEL_SELECTIONS = frozenset({"iforest", "lof", "both"})
+
+
+def _resolve_models(model_selection: str) -> List[str]:
     """
-    Score a batch of interaction records with selected models.
+    Validate a model selection and list the models it needs.
     
     Args:
-        records: List of interaction records
         model_selection: Model to use ('iforest', 'lof', or 'both')
     
     Returns:
-        List of anomaly scores with requested model results
+        Internal names of the models to compute
     """
     # Check if models are loaded
-    if not _model_state["models"]:
+    models = _model_state["models"]
+    if not models:
         raise HTTPException(status_code=503, detail="Models not loaded")
     
-    # Normalize model selection and map aliases
+    # Normalize and validate model selection
     model_selection = model_selection.lower()
-    model_map = {"lof": "lof"}  # lof is an alias for LOF
-    
-    # Validate model selection
-    valid_selections = {"iforest", "lof", "lof", "both"}
-    if model_selection not in valid_selections:
+    if model_selection not in _VALID_MODEL_SELECTIONS:
         raise HTTPException(
             status_code=400,
             detail="model must be one of: iforest, lof, both"
         )
     
     # Determine which models to compute
-    if model_selection == "both":
-        models_to_compute = ["iforest", "lof"]
-    elif model_selection in model_map:
-        models_to_compute = [model_map[model_selection]]
-    else:
-        models_to_compute = [model_selection]
+    models_to_compute = ["iforest", "lof"] if model_selection == "both" else [model_selection]
     
     # Ensure requested models are available
-    available_models = set(_model_state["models"].keys())
+    available_models = set(models.keys())
     for model_name in models_to_compute:
         if model_name not in available_models:
             raise HTTPException(
@@ -144,110 +349,305 @@ def score_records(records: List[InteractionRecord], model_selection: str = "both
                 detail=f"Model '{model_name}' not available"
             )
     
-    # Convert to DataFrame
-    records_data = [record.model_dump() for record in records]
-    df = pd.DataFrame(records_data)
+    return models_to_compute
+
+
+def _flag_anomalies(scores: np.ndarray, threshold: float) -> np.ndarray:
+    """Return 0/1 int8 flags for ``scores >= threshold``, compared straight into the int8 buffer."""
+    flags = np.empty(scores.shape[0], dtype=np.int8)
+    np.greater_equal(scores, threshold, out=flags.view(np.bool_))
+    return flags
+
+
+def _score_iforest(X, state: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Score features with IForest from a model state snapshot, returning (scores, 0/1 anomaly flags)."""
+    iforest_model = state["models"]["iforest"]
+    iforest_metadata = state["metadata"]["iforest"]
+    iforest_threshold = iforest_metadata["threshold"]
+    iforest_scores = -iforest_score_samples(iforest_model, X)
+    iforest_anomalies = _flag_anomalies(iforest_scores, iforest_threshold)
+    log.info(f"IForest - Detected {iforest_anomalies.sum()} anomalies ({100 * iforest_anomalies.mean():.2f}%)")
+    return iforest_scores, iforest_anomalies
+
+
+def _score_lof(X, state: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Score features with LOF from a model state snapshot, returning (scores, 0/1 anomaly flags)."""
+    lof_model = state["models"]["lof"]
+    lof_metadata = state["metadata"]["lof"]
+    lof_threshold = lof_metadata["threshold"]
+    score_samples = state.get("lof_score_samples") or lof_model.detector_.score_samples
+    lof_scores = -score_samples(X)
+    lof_anomalies = _flag_anomalies(lof_scores, lof_threshold)
+    log.info(f"LOF - Detected {lof_anomalies.sum()} anomalies ({100 * lof_anomalies.mean():.2f}%)")
+    return lof_scores, lof_anomalies
+
+
+_MODEL_SCORERS = {"iforest": _score_iforest, "lof": _score_lof}
+
+
+def _weighted_normalized(
+    scores: np.ndarray, lo: float, scale: float, weight: float, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Compute ``clip((scores - lo) * scale, 0, 1) * weight`` in a single buffer (new unless ``out`` is given)."""
+    out = np.subtract(scores, lo, out=out)
+    out *= scale
+    np.clip(out, 0, 1, out=out)
+    out *= weight
+    return out
+
+
+def _score_frame(records: List[InteractionRecord], models_to_compute: List[str]) -> Tuple[dict, dict]:
+    """
+    Run the preprocessor and the requested models over a batch of records.
+    
+    The ensemble score and flag are added when both IForest and LOF are computed.
+    
+    Args:
+        records: List of interaction records
+        models_to_compute: Internal names of the models to run
+    
+    Returns:
+        Tuple of (scores, anomalies) dicts mapping model name to per-record arrays
+    """
+    # One snapshot for the whole pass; a concurrent reload publishes a new
+    # dict rather than changing this one
+    state = _model_state
+    config = state["config"]
+    preprocessor = state["preprocessor"]
     
-    # Prepare features
-    config = _model_state["config"]
-    feature_df, identifier_cols = prepare_features(df, config["features"], is_training=False)
+    if state.get("transform_plan"):
+        # Fast path: fill arrays straight from the records and run the fitted
+        # sub-transformers, skipping the DataFrame build and column dispatch
+        X = _transform_records(records, state["transform_plan"], preprocessor.sparse_output_)
+    else:
+        # Convert to DataFrame
+        records_data = [record.model_dump() for record in records]
+        df = pd.DataFrame(records_data)
+        
+        # Prepare features and transform
+        feature_df, identifier_cols = prepare_features(df, config["features"], is_training=False)
+        X = preprocessor.transform(feature_df)
     
-    # Transform features
-    preprocessor = _model_state["preprocessor"]
-    X = preprocessor.transform(feature_df)
+    # Row-major float32 halves the bytes the tree and kNN walks read
+    X = ensure_float32(X)
+    
+    # Compute requested models; when both are requested they run concurrently,
+    # as sklearn's tree walks and kNN queries release the GIL
+    if len(models_to_compute) > 1:
+        futures = {name: _SCORING_POOL.submit(_MODEL_SCORERS[name], X, state) for name in models_to_compute}
+        results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: _MODEL_SCORERS[name](X, state) for name in models_to_compute}
     
     # Storage for computed scores and flags
-    computed_scores = {}
-    computed_anomalies = {}
-    
-    # Compute requested models
-    if "iforest" in models_to_compute:
-        iforest_model = _model_state["models"]["iforest"]
-        iforest_metadata = _model_state["metadata"]["iforest"]
-        iforest_threshold = iforest_metadata["threshold"]
-        iforest_scores = -iforest_model.score_samples(X)
-        iforest_anomalies = (iforest_scores >= iforest_threshold).astype(int)
-        computed_scores["iforest"] = iforest_scores
-        computed_anomalies["iforest"] = iforest_anomalies
-        log.info(f"IForest - Detected {iforest_anomalies.sum()} anomalies ({100 * iforest_anomalies.mean():.2f}%)")
-    
-    if "lof" in models_to_compute:
-        lof_model = _model_state["models"]["lof"]
-        lof_metadata = _model_state["metadata"]["lof"]
-        lof_threshold = lof_metadata["threshold"]
-        lof_scores = -lof_model.detector_.score_samples(X)
-        lof_anomalies = (lof_scores >= lof_threshold).astype(int)
-        computed_scores["lof"] = lof_scores
-        computed_anomalies["lof"] = lof_anomalies
-        log.info(f"LOF - Detected {lof_anomalies.sum()} anomalies ({100 * lof_anomalies.mean():.2f}%)")
+    computed_scores = {name: scores for name, (scores, _) in results.items()}
+    computed_anomalies = {name: anomalies for name, (_, anomalies) in results.items()}
     
     # Compute ensemble score and flag if both models requested
-    if model_selection == "both" and "iforest" in computed_anomalies and "lof" in computed_anomalies:
-        # Get ensemble configuration
-        ensemble_config = config["ensemble"]
-        weights = ensemble_config["weights"]
-        iforest_weight = weights.get("iforest", 0.5)
-        lof_weight = weights.get("lof", 0.5)
-        
-        # Normalize scores to [0, 1] range using training stats
-        iforest_min = iforest_metadata["score_stats"]["min"]
-        iforest_max = iforest_metadata["score_stats"]["max"]
-        iforest_normalized = (computed_scores["iforest"] - iforest_min) / (iforest_max - iforest_min + 1e-10)
-        iforest_normalized = np.clip(iforest_normalized, 0, 1)
+    if "iforest" in computed_anomalies and "lof" in computed_anomalies:
+        # Normalization constants are precomputed at load (derived here only
+        # when the model state was populated without load_model_artifacts)
+        norm = state["norm"] or _build_ensemble_norm(state["metadata"], config)
+        iforest_min, iforest_scale, iforest_weight = norm["iforest"]
+        lof_min, lof_scale, lof_weight = norm["lof"]
         
-        lof_min = lof_metadata["score_stats"]["min"]
-        lof_max = lof_metadata["score_stats"]["max"]
-        lof_normalized = (computed_scores["lof"] - lof_min) / (lof_max - lof_min + 1e-10)
-        lof_normalized = np.clip(lof_normalized, 0, 1)
-        
-        # Weighted average of normalized scores
-        ensemble_scores = iforest_weight * iforest_normalized + lof_weight * lof_normalized
+        # Weighted average of scores normalized to [0, 1] with training stats;
+        # the LOF term is computed in this thread's scratch buffer (it never
+        # leaves this call) and accumulated into the IForest buffer
+        lof_scores = computed_scores["lof"]
+        lof_term = scratch_buffer("lof_weighted", lof_scores.shape[0], lof_scores.dtype)
+        ensemble_scores = _weighted_normalized(computed_scores["iforest"], iforest_min, iforest_scale, iforest_weight)
+        ensemble_scores += _weighted_normalized(lof_scores, lof_min, lof_scale, lof_weight, out=lof_term)
         computed_scores["ensemble"] = ensemble_scores
         
-        # Ensemble anomaly: OR of individual model anomalies
-        ensemble_anomalies = np.logical_or(
-            computed_anomalies["iforest"], 
-            computed_anomalies["lof"]
-        ).astype(int)
+        # Ensemble anomaly: OR of individual model anomalies (single pass over int8 flags)
+        ensemble_anomalies = np.bitwise_or(computed_anomalies["iforest"], computed_anomalies["lof"])
         computed_anomalies["ensemble"] = ensemble_anomalies
         log.info(f"Ensemble - Detected {ensemble_anomalies.sum()} anomalies ({100 * ensemble_anomalies.mean():.2f}%)")
     
-    # Build response with selective fields based on model_selection
-    results = []
-    for i, record in enumerate(records):
-        scores_dict = {}
-        is_anomaly_dict = {}
+    return computed_scores, computed_anomalies
+
+
+def _build_scores(
+    records: List[InteractionRecord],
+    computed_scores: dict,
+    computed_anomalies: dict,
+) -> List[AnomalyScore]:
+    """
+    Build per-record API responses from computed score and flag arrays.
+    
+    Args:
+        records: List of interaction records
+        computed_scores: Model name to score array (aligned with records)
+        computed_anomalies: Model name to 0/1 int8 flag array (aligned with records)
+    
+    Returns:
+        List of anomaly scores with the computed model results
+    """
+    # Models appear in computation order (iforest, lof, then ensemble).
+    # tolist() converts each array to Python floats/ints in one C pass instead
+    # of a float()/int() call per record and model
+    score_names = list(computed_scores)
+    flag_names = list(computed_anomalies)
+    score_rows = zip(*(computed_scores[name].tolist() for name in score_names))
+    flag_rows = zip(*(computed_anomalies[name].tolist() for name in flag_names))
+    
+    # Values are already plain floats and 0/1 ints, so skip re-validation
+    return [
+        AnomalyScore.model_construct(
+            interaction_id=record.interaction_id,
+            scores=dict(zip(score_names, score_row)),
+            is_anomaly=dict(zip(flag_names, flag_row)),
+        )
+        for record, score_row, flag_row in zip(records, score_rows, flag_rows)
+    ]
+
+
+def _count_anomalies(computed_anomalies: dict) -> int:
+    """
+    Count flagged records from the flag arrays.
+    
+    The ensemble flag is used when both models ran; otherwise a record counts
+    if any computed model flagged it.
+    
+    Args:
+        computed_anomalies: Model name to 0/1 int8 flag array
+    
+    Returns:
+        Number of anomalous records
+    """
+    if "ensemble" in computed_anomalies:
+        flags = computed_anomalies["ensemble"]
+    else:
+        flags = np.maximum.reduce(list(computed_anomalies.values()))
+    return int(np.count_nonzero(flags))
+
+
+def score_records(
+    records: List[InteractionRecord], model_selection: str = "both"
+) -> Tuple[List[AnomalyScore], int]:
+    """
+    Score a batch of interaction records with selected models.
+    
+    Args:
+        records: List of interaction records
+        model_selection: Model to use ('iforest', 'lof', or 'both')
+    
+    Returns:
+        Tuple of (anomaly scores with requested model results, anomaly count)
+    """
+    models_to_compute = _resolve_models(model_selection)
+    computed_scores, computed_anomalies = _score_frame(records, models_to_compute)
+    scores = _build_scores(records, computed_scores, computed_anomalies)
+    return scores, _count_anomalies(computed_anomalies)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent /score requests into a single model pass.
+    
+    Requests queued within ``window_ms`` of the first one (up to
+    ``max_records`` records) are concatenated, scored once with the union of
+    their requested models, and each caller gets back only its own rows and
+    models. This amortizes the fixed per-call cost of the preprocessor and
+    ``score_samples`` under concurrent load.
+    """
+    
+    def __init__(self, window_ms: float, max_records: int):
+        self.window = window_ms / 1000
+        self.max_records = max_records
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start the background batching task on the running event loop."""
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Cancel the background batching task."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+    
+    async def submit(self, records: List[InteractionRecord], models_to_compute: List[str]) -> Tuple[dict, dict]:
+        """
+        Queue records for the next batch and wait for their results.
+        
+        Args:
+            records: List of interaction records
+            models_to_compute: Internal names of the models to run
         
-        # Map internal model names to API names (lof -> lof for API)
-        api_name_map = {"lof": "lof", "iforest": "iforest"}
+        Returns:
+            Tuple of (scores, anomalies) dicts for just these records
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, models_to_compute, future))
+        return await future
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            n_records = len(batch[0][0])
+            deadline = loop.time() + self.window
+            
+            # Keep collecting until the window closes or the batch is full
+            while n_records < self.max_records:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_records += len(item[0])
+            
+            await self._score_batch(batch)
+    
+    async def _score_batch(self, batch: list):
+        records = [record for item_records, _, _ in batch for record in item_records]
+        models = sorted({name for _, item_models, _ in batch for name in item_models})
         
-        for internal_name, score_array in computed_scores.items():
-            api_name = api_name_map.get(internal_name, internal_name)
-            # Skip ensemble score in the scores dict, only include in is_anomaly
-            if internal_name != "ensemble":
-                scores_dict[api_name] = float(score_array[i])
-                is_anomaly_dict[api_name] = int(computed_anomalies[internal_name][i])
+        try:
+            # Scoring is CPU-bound; keep the event loop free to accept requests
+            computed_scores, computed_anomalies = await asyncio.to_thread(_score_frame, records, models)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
         
-        # Add ensemble flag and score if computed
-        if "ensemble" in computed_anomalies:
-            is_anomaly_dict["ensemble"] = int(computed_anomalies["ensemble"][i])
-        if "ensemble" in computed_scores:
-            scores_dict["ensemble"] = float(computed_scores["ensemble"][i])
+        log.info(f"Micro-batch scored {len(records)} records for {len(batch)} request(s)")
         
-        results.append(
-            AnomalyScore(
-                interaction_id=record.interaction_id,
-                scores=scores_dict,
-                is_anomaly=is_anomaly_dict,
-            )
-        )
-    
-    return results
+        # Slice each caller's rows back out, keeping only the models it asked for
+        offset = 0
+        for item_records, item_models, future in batch:
+            rows = slice(offset, offset + len(item_records))
+            offset += len(item_records)
+            if future.done():
+                continue
+            
+            keep = set(item_models)
+            if {"iforest", "lof"} <= keep:
+                keep.add("ensemble")
+            future.set_result((
+                {name: arr[rows] for name, arr in computed_scores.items() if name in keep},
+                {name: arr[rows] for name, arr in computed_anomalies.items() if name in keep},
+            ))
+
+
+# Set on startup when SCORE_BATCH_WINDOW_MS > 0
+_batcher: Optional[MicroBatcher] = None
 
 
 @app.on_event("startup")
 async def startup_event():
     """Load model on startup."""
+    global _batcher
+    
     log.info("Starting CX Anomaly Detector API...")
     try:
         load_model_artifacts()
@@ -255,6 +655,21 @@ async def startup_event():
     except Exception as e:
         log.error(f"Failed to initialize API: {e}")
         # Allow startup to continue but mark model as unavailable
+    
+    if SCORE_BATCH_WINDOW_MS > 0:
+        _batcher = MicroBatcher(SCORE_BATCH_WINDOW_MS, SCORE_BATCH_MAX_RECORDS)
+        _batcher.start()
+        log.info(f"Micro-batching enabled ({SCORE_BATCH_WINDOW_MS:g}ms window)")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the micro-batcher."""
+    global _batcher
+    
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -273,12 +688,13 @@ async def health_check():
 @app.get("/models")
 async def list_models():
     """List available models and their metadata."""
-    if not _model_state["models"]:
+    state = _model_state
+    if not state["models"]:
         raise HTTPException(status_code=503, detail="Models not loaded")
     
     models_info = {}
-    for model_name in _model_state["models"].keys():
-        metadata = _model_state["metadata"][model_name]
+    for model_name in state["models"].keys():
+        metadata = state["metadata"][model_name]
         models_info[model_name] = {
             "algorithm": metadata["algorithm"],
             "threshold": metadata["threshold"],
@@ -290,56 +706,118 @@ async def list_models():
     return {
         "models": models_info,
         "ensemble_available": len(models_info) > 1,
-        "loaded_at": _model_state["loaded_at"].isoformat() if _model_state["loaded_at"] else None,
+        "loaded_at": state["loaded_at"].isoformat() if state["loaded_at"] else None,
     }
 
 
-@app.post("/score", response_model=BatchScoreResponse)
+@app.post(
+    "/score",
+    response_model=BatchScoreResponse,
+    # The body is parsed by hand below; document it as a list of records
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": InteractionRecord.model_json_schema()}
+                }
+            },
+        }
+    },
+)
 async def score_interactions(
-    records: List[InteractionRecord],
-    model: str = Query(default="both", description="Model to use: 'iforest', 'lof', or 'both' (default)")
+    request: Request,
+    model: str = Query(default="both", description="Model to use: 'iforest', 'lof', or 'both' (default)"),
+    format: str = Query(
+        default="records",
+        description="Response layout: 'records' (one object per record, default) or 'columnar' (one array per model)",
+    ),
 ):
     """
     Score a batch of interaction records for anomalies.
     
+    The JSON body (a list of interaction records) is validated straight from
+    bytes with the precompiled ``INTERACTION_RECORDS_ADAPTER``, skipping
+    FastAPI's json.loads + per-field body validation.
+    
+    With ``format=columnar`` the response is a ``ColumnarScoreResponse``: the
+    score and flag arrays are emitted as-is, with no per-record objects built
+    on the way out.
+    
     Args:
-        records: List of interaction records to score
+        request: Request whose body is the list of interaction records to score
         model: Model selection ('iforest', 'lof', or 'both'). Default is 'both'.
+        format: Response layout ('records' or 'columnar'). Default is 'records'.
     
     Returns:
         Batch score response with anomaly flags and scores for requested model(s)
     """
     start_time = time.time()
     
+    if format not in ("records", "columnar"):
+        raise HTTPException(status_code=400, detail="format must be one of: records, columnar")
+    
+    body = await request.body()
+    try:
+        records = INTERACTION_RECORDS_ADAPTER.validate_json(body)
+    except ValidationError as e:
+        # Same 422 shape FastAPI produces for an invalid body
+        errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=body)
+    
     try:
         log.info(f"Scoring {len(records)} records with model: {model}")
         
-        # Score records (validation happens inside)
-        scores = score_records(records, model_selection=model)
+        # Score records, coalesced with concurrent requests when batching is on
+        models_to_compute = _resolve_models(model)
+        if _batcher is not None:
+            computed_scores, computed_anomalies = await _batcher.submit(records, models_to_compute)
+        else:
+            # Scoring is CPU-bound; run it on the threadpool so the event loop
+            # keeps serving other requests (sklearn/NumPy release the GIL)
+            computed_scores, computed_anomalies = await run_in_threadpool(
+                _score_frame, records, models_to_compute
+            )
+        
+        # Count anomalies based on what was requested: the ensemble flag for
+        # both models, otherwise the single model's flag
+        anomalies_detected = _count_anomalies(computed_anomalies)
+        
+        if format == "columnar":
+            processing_time_ms = (time.time() - start_time) * 1000
+            
+            log.info(f"Scored {len(records)} records in {processing_time_ms:.2f}ms, "
+                     f"detected {anomalies_detected} anomalies (model={model}, format=columnar)")
+            
+            # tolist() hands pydantic-core plain lists it encodes in one pass
+            response = ColumnarScoreResponse.model_construct(
+                interaction_ids=[record.interaction_id for record in records],
+                scores={name: values.tolist() for name, values in computed_scores.items()},
+                is_anomaly={name: flags.tolist() for name, flags in computed_anomalies.items()},
+                total_records=len(records),
+                anomalies_detected=anomalies_detected,
+                processing_time_ms=processing_time_ms,
+            )
+            return Response(content=response.model_dump_json(), media_type="application/json")
         
-        # Calculate metrics - count anomalies based on what was requested
-        # For single model: count that model's anomalies
-        # For both: count ensemble anomalies
-        anomalies_detected = 0
-        for s in scores:
-            if "ensemble" in s.is_anomaly:
-                anomalies_detected += s.is_anomaly["ensemble"]
-            else:
-                # Single model case - count if any model flagged as anomaly
-                anomalies_detected += max(s.is_anomaly.values())
+        scores = _build_scores(records, computed_scores, computed_anomalies)
         
         processing_time_ms = (time.time() - start_time) * 1000
         
         log.info(f"Scored {len(records)} records in {processing_time_ms:.2f}ms, "
                  f"detected {anomalies_detected} anomalies (model={model})")
         
-        return BatchScoreResponse(
+        response = BatchScoreResponse(
             scores=scores,
             total_records=len(records),
             anomalies_detected=anomalies_detected,
             processing_time_ms=processing_time_ms,
         )
         
+        # Encode straight to JSON bytes in pydantic-core; returning a Response
+        # skips FastAPI's jsonable_encoder + json.dumps pass over every record
+        return Response(content=response.model_dump_json(), media_type="application/json")
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -347,9 +825,169 @@ async def score_interactions(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that can be sent while the request body is still being read.
+    
+    Starlette's version listens for ``http.disconnect`` on ``receive`` while it
+    streams, which steals the body messages ``request.stream()`` is waiting for.
+    This one only streams, so it has no disconnect listener and runs no
+    background tasks (passing ``background`` is rejected). A client dropping
+    mid-upload surfaces as ``ClientDisconnect`` from the body stream; once the
+    body is fully read, at most the last chunk is still scored.
+    """
+    
+    def __init__(self, content, status_code=200, headers=None, media_type=None, background=None):
+        if background is not None:
+            raise ValueError("_DuplexStreamingResponse does not run background tasks")
+        super().__init__(content, status_code=status_code, headers=headers, media_type=media_type)
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+class _LineTooLong(Exception):
+    """A streamed JSONL line exceeded the maximum line length."""
+    
+    def __init__(self, line_number: int, max_line_bytes: int):
+        super().__init__(f"Line exceeds {max_line_bytes} bytes")
+        self.line_number = line_number
+
+
+async def _iter_jsonl_chunks(request: Request, chunk_size: int, max_line_bytes: int):
+    """
+    Read a streamed JSONL body ``chunk_size`` non-blank lines at a time.
+    
+    Args:
+        request: Request with the JSONL body
+        chunk_size: Non-blank lines per yielded chunk
+        max_line_bytes: Longest accepted line, so a body without newlines
+            cannot grow the buffer without bound
+    
+    Yields:
+        Lists of (1-based input line number, raw line) pairs; blank lines are
+        skipped but still counted
+    
+    Raises:
+        _LineTooLong: As soon as a line is known to exceed ``max_line_bytes``
+    """
+    chunk = []
+    buffer = bytearray()
+    line_number = 0
+    async for piece in request.stream():
+        # Only the new bytes are searched for newlines, and consumed lines are
+        # trimmed once per piece, so a long line costs linear time
+        scan_from = len(buffer)
+        buffer += piece
+        start = 0
+        while (end := buffer.find(b"\n", scan_from)) != -1:
+            line_number += 1
+            if end - start > max_line_bytes:
+                raise _LineTooLong(line_number, max_line_bytes)
+            line = bytes(buffer[start:end])
+            if line.strip():
+                chunk.append((line_number, line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            start = scan_from = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise _LineTooLong(line_number + 1, max_line_bytes)
+    if buffer.strip():
+        chunk.append((line_number + 1, bytes(buffer)))
+    if chunk:
+        yield chunk
+
+
+def _jsonl_error(message: str, line_number: int) -> bytes:
+    """Log a rejected /score/batch line and encode the stream's final error record."""
+    log.error(f"Invalid record on line {line_number}: {message}")
+    return (json.dumps({"error": message, "line": line_number}) + "\n").encode()
+
+
+def _first_invalid_line(chunk: list) -> Tuple[int, str]:
+    """
+    Find the first line of a JSONL chunk that is not exactly one valid record.
+    
+    Args:
+        chunk: (line number, raw line) pairs from ``_iter_jsonl_chunks``
+    
+    Returns:
+        Line number and error message of the first invalid line
+    """
+    for line_number, line in chunk:
+        try:
+            InteractionRecord.model_validate_json(line)
+        except ValidationError as e:
+            return line_number, e.errors(include_url=False)[0]["msg"]
+    # Every line is valid on its own, so only their combination was not
+    return chunk[0][0], "Invalid JSONL chunk"
+
+
+@app.post("/score/batch")
+async def score_batch_stream(
+    request: Request,
+    model: str = Query(default="both", description="Model to use: 'iforest', 'lof', or 'both' (default)")
+):
+    """
+    Score a JSONL stream of interaction records, streaming JSONL scores back.
+    
+    Records are read and scored ``SCORE_STREAM_CHUNK_SIZE`` at a time (one
+    preprocessor and model pass per chunk), so memory stays bounded however
+    large the upload is. Output lines are ``AnomalyScore`` objects in input
+    order. Since the response has already started, an invalid line (one that
+    is not exactly one valid record, or longer than
+    ``SCORE_STREAM_MAX_LINE_BYTES``) ends the stream, its chunk unscored,
+    with a final ``{"error": ..., "line": ...}`` line giving its 1-based
+    input line number.
+    
+    Args:
+        request: Request whose body is one interaction record JSON per line
+        model: Model selection ('iforest', 'lof', or 'both'). Default is 'both'.
+    
+    Returns:
+        Streaming ``application/x-ndjson`` response
+    """
+    # Fail fast on a bad model selection, before the response starts
+    models_to_compute = _resolve_models(model)
+    
+    async def generate():
+        n_scored = 0
+        chunks = _iter_jsonl_chunks(request, SCORE_STREAM_CHUNK_SIZE, SCORE_STREAM_MAX_LINE_BYTES)
+        try:
+            async for chunk in chunks:
+                # Validate the whole chunk in one pass; a line holding more (or
+                # less) than one record shows up as a count mismatch
+                try:
+                    records = INTERACTION_RECORDS_ADAPTER.validate_json(
+                        b"[" + b",".join(line for _, line in chunk) + b"]"
+                    )
+                except ValidationError:
+                    records = None
+                if records is None or len(records) != len(chunk):
+                    line_number, message = _first_invalid_line(chunk)
+                    yield _jsonl_error(message, line_number)
+                    return
+                
+                computed_scores, computed_anomalies = await run_in_threadpool(
+                    _score_frame, records, models_to_compute
+                )
+                scores = _build_scores(records, computed_scores, computed_anomalies)
+                n_scored += len(scores)
+                yield "".join(score.model_dump_json() + "\n" for score in scores).encode()
+        except _LineTooLong as e:
+            yield _jsonl_error(str(e), e.line_number)
+            return
+        
+        log.info(f"Streamed scores for {n_scored} records (model={model})")
+    
+    return _DuplexStreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @app.post("/reload")
-async def reload_model():
-    """Reload model artifacts (useful for updates)."""
+def reload_model():
+    """Reload model artifacts (useful for updates; sync, so it runs on the threadpool)."""
     try:
         log.info("Reloading model artifacts...")
         load_model_artifacts()
@@ -369,6 +1007,7 @@ async def root():
             "health": "/health",
             "models": "/models",
             "score": "/score",
+            "score_batch": "/score/batch",
             "reload": "/reload",
             "docs": "/docs",
         },
@@ -380,6 +1019,8 @@ if __name__ == "__main__":
     
     host = os.getenv("API_HOST", "0.0.0.0")
     port = int(os.getenv("API_PORT", 8000))
+    workers = int(os.getenv("API_WORKERS", 1))
     
-    log.info(f"Starting server on {host}:{port}")
-    uvicorn.run(app, host=host, port=port)
+    log.info(f"Starting server on {host}:{port} with {workers} worker(s)")
+    # Multiple worker processes need the app as an import string
+    uvicorn.run("src.service:app" if workers > 1 else app, host=host, port=port, workers=workers)
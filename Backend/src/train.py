@@ -8,12 +8,13 @@ from pathlib import Path
 import joblib
 import numpy as np
 import yaml
+from scipy import sparse
 from dotenv import load_dotenv
 from sklearn.ensemble import IsolationForest
 from pyod.models.lof import LOF
 
 from src.features import build_preprocessor, prepare_features, validate_schema
-from src.io_utils import load_csv
+from src.io_utils import file_fingerprint, load_csv
 from src.telemetry import get_logger, setup_logging
 
 # Load environment variables
@@ -55,6 +56,7 @@ def train_models(config: dict) -> dict:
     # Load training data
     train_path = config["data"]["train_path"]
     log.info(f"Loading training data from: {train_path}")
+    train_fingerprint = file_fingerprint(train_path)
     df = load_csv(train_path)
     
     # Validate schema
@@ -139,6 +141,8 @@ def train_models(config: dict) -> dict:
         "train_timestamp": datetime.now(timezone.utc).isoformat(),
         "n_samples": len(df),
         "n_features": X_train.shape[1],
+        # Lets evaluate tell whether the cached X_train still matches the data
+        "train_fingerprint": train_fingerprint,
         "models_trained": list(models.keys()),
         "config_snapshot": config,
     }
@@ -147,6 +151,7 @@ def train_models(config: dict) -> dict:
         "preprocessor": preprocessor,
         "models": models,
         "metadata": metadata,
+        "X_train": X_train,
     }
 
 
@@ -164,7 +169,8 @@ def save_artifacts(artifacts: dict, config: dict) -> None:
     # Save preprocessor (shared)
     preprocessor_path = Path(artifacts_dir) / config["artifacts"]["preprocessor"]
     log.info(f"Saving preprocessor to: {preprocessor_path}")
-    joblib.dump(artifacts["preprocessor"], preprocessor_path)
+    # Uncompressed so loaders can memory-map the arrays (compression defeats mmap)
+    joblib.dump(artifacts["preprocessor"], preprocessor_path, compress=0)
     
     # Save each model and its metadata
     model_template = config["artifacts"]["model_template"]
@@ -174,7 +180,7 @@ def save_artifacts(artifacts: dict, config: dict) -> None:
         # Save model
         model_path = Path(artifacts_dir) / model_template.format(name=model_name)
         log.info(f"Saving {model_name} model to: {model_path}")
-        joblib.dump(model, model_path)
+        joblib.dump(model, model_path, compress=0)
         
         # Save model-specific metadata
         meta_path = Path(artifacts_dir) / meta_template.format(name=model_name)
@@ -186,6 +192,15 @@ def save_artifacts(artifacts: dict, config: dict) -> None:
     log.info(f"Saving global metadata to: {global_meta_path}")
     joblib.dump(artifacts["metadata"]["global"], global_meta_path)
     
+    # Save transformed training features for evaluation reruns
+    # (only dense matrices can be memory-mapped back from .npy)
+    feature_cache = config["artifacts"].get("feature_cache")
+    X_train = artifacts.get("X_train")
+    if feature_cache and X_train is not None and not sparse.issparse(X_train):
+        feature_cache_path = Path(artifacts_dir) / feature_cache
+        log.info(f"Saving transformed training features to: {feature_cache_path}")
+        np.save(feature_cache_path, X_train)
+    
     log.info("All artifacts saved successfully")
 
 
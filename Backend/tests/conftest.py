@@ -0,0 +1,105 @@
+"""Shared pytest fixtures."""
+
+import copy
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.train import train_models
+
+TRAIN_CONFIG = {
+    "data": {
+        "train_path": "./data/input/mock_train.csv",
+        "inference_path": "./data/input/mock_inference.csv",
+        "output_dir": "./data/processed",
+    },
+    "artifacts": {
+        "dir": "./models/artifacts",
+        "preprocessor": "preprocessor.joblib",
+        "model_template": "model_{name}.joblib",
+        "meta_template": "meta_{name}.joblib",
+    },
+    "features": {
+        "numeric": ["csat", "ies", "aht_seconds"],
+        "categorical": ["channel", "language"],
+        "drop_columns": ["interaction_id", "timestamp"],
+        "identifier_columns": ["interaction_id", "timestamp"],
+    },
+    "preprocessing": {
+        "numeric_strategy": "mean",
+        "scale_method": "standard",
+        "categorical_unknown": "ignore",
+    },
+    "models": [
+        {
+            "name": "iforest",
+            "algorithm": "IsolationForest",
+            "params": {
+                "n_estimators": 10,
+                "max_samples": 32,
+                "contamination": 0.1,
+                "random_state": 42,
+                "n_jobs": 1,
+            },
+            "threshold_percentile": 90,
+        },
+        {
+            "name": "lof",
+            "algorithm": "LOF",
+            "params": {"n_neighbors": 10, "contamination": 0.1, "novelty": True},
+            "threshold_percentile": 90,
+        },
+    ],
+    "ensemble": {
+        "strategy": "average",
+        "weights": {"iforest": 0.5, "lof": 0.5},
+    },
+}
+
+
+_RNG = np.random.default_rng(42)
+
+# Training data columns, drawn once at import from a single seeded generator
+TRAIN_COLUMNS = {
+    "interaction_id": [f"id{i}" for i in range(50)],
+    "timestamp": ["2025-01-01"] * 50,
+    "csat": _RNG.uniform(1, 5, 50),
+    "ies": _RNG.uniform(50, 100, 50),
+    "aht_seconds": _RNG.uniform(200, 600, 50),
+    "channel": _RNG.choice(["voice", "chat", "email"], 50),
+    "language": _RNG.choice(["en", "es", "fr"], 50),
+}
+
+
+@pytest.fixture(scope="session")
+def session_training_csv(tmp_path_factory):
+    """Create the temporary training data CSV once per session."""
+    df = pd.DataFrame(TRAIN_COLUMNS)
+    
+    path = tmp_path_factory.mktemp("data") / "train.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def training_csv(tmp_path, session_training_csv):
+    """Per-test copy of the session training CSV, safe to modify."""
+    path = tmp_path / "train.csv"
+    shutil.copy(session_training_csv, path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def train_config(session_training_csv):
+    """Training configuration pointing at the session training CSV."""
+    config = copy.deepcopy(TRAIN_CONFIG)
+    config["data"]["train_path"] = str(session_training_csv)
+    return config
+
+
+@pytest.fixture(scope="session")
+def trained_bundle(train_config):
+    """Train the models once per session; returns (config, artifacts)."""
+    return train_config, train_models(train_config)
@@ -7,7 +7,10 @@ from sklearn.compose import ColumnTransformer
 
 from src.features import (
     build_preprocessor,
+    build_read_schema,
+    ensure_float32,
     get_feature_names,
+    get_read_columns,
     prepare_features,
     validate_schema,
 )
@@ -63,6 +66,36 @@ def test_prepare_features(sample_data, sample_config):
     
     # Check identifier columns returned
     assert "interaction_id" in identifier_cols
+    
+    # Check modeling dtypes
+    assert feature_df["csat"].dtype == np.float32
+    assert isinstance(feature_df["channel"].dtype, pd.CategoricalDtype)
+
+
+def test_build_read_schema(sample_config):
+    """Test read schema types numerics as float32 and parses timestamps."""
+    schema = build_read_schema(sample_config)
+    
+    assert schema["dtype"] == {
+        "csat": "float32",
+        "ies": "float32",
+        "aht_seconds": "float32",
+        "channel": "category",
+        "language": "category",
+    }
+    assert schema["parse_dates"] == ["timestamp"]
+    
+    # Without date parsing the timestamp is kept as a string
+    raw_schema = build_read_schema(sample_config, parse_dates=False)
+    assert raw_schema["dtype"]["timestamp"] == "str"
+    assert raw_schema["parse_dates"] == []
+
+
+def test_get_read_columns(sample_config):
+    """Test scoring reads only identifiers and model features."""
+    assert get_read_columns(sample_config) == [
+        "interaction_id", "timestamp", "csat", "ies", "aht_seconds", "channel", "language",
+    ]
 
 
 def test_validate_schema_valid(sample_data, sample_config):
@@ -95,6 +128,36 @@ def test_preprocessor_fit_transform(sample_data, sample_config):
     assert X.shape[1] > 0  # Should have features
 
 
+def test_ensure_float32():
+    """Test float64 matrices are cast and float32 ones passed through."""
+    X64 = np.ones((3, 2), dtype=np.float64)
+    assert ensure_float32(X64).dtype == np.float32
+    
+    X32 = np.ones((3, 2), dtype=np.float32)
+    assert ensure_float32(X32) is X32
+    
+    # Column-major input is copied to row-major
+    X_fortran = np.asfortranarray(X32)
+    assert ensure_float32(X_fortran).flags["C_CONTIGUOUS"]
+
+
+def test_float32_features_keep_iforest_scores():
+    """Test IForest trained and scored on float32 matches the float64 pipeline."""
+    from sklearn.ensemble import IsolationForest
+    
+    rng = np.random.default_rng(0)
+    X_train = rng.normal(size=(200, 4))
+    X_holdout = rng.normal(size=(50, 4))
+    
+    model64 = IsolationForest(n_estimators=20, random_state=0).fit(X_train)
+    model32 = IsolationForest(n_estimators=20, random_state=0).fit(ensure_float32(X_train))
+    
+    np.testing.assert_array_equal(
+        model32.score_samples(ensure_float32(X_holdout)),
+        model64.score_samples(X_holdout),
+    )
+
+
 def test_preprocessor_handles_missing_values(sample_config):
     """Test that preprocessor handles missing values."""
     df_with_nulls = pd.DataFrame({
@@ -0,0 +1,48 @@
+"""Unit tests for API schemas."""
+
+import functools
+import json
+
+import pytest
+
+from src.schema import AnomalyScore
+
+# (scores, is_anomaly flags, keys that must not appear) per model selection
+SCORE_SHAPES = {
+    "iforest": ({"iforest": 0.85}, {"iforest": 1}, {"lof", "ensemble"}),
+    "lof": ({"lof": 1.23}, {"lof": 1}, {"iforest", "ensemble"}),
+    "both": ({"iforest": 0.85, "lof": 1.23}, {"iforest": 1, "lof": 1, "ensemble": 1}, set()),
+}
+
+
+@functools.cache
+def _dumped(shape: str):
+    """Build the score for a shape once; returns (model_dump(), model_dump_json())."""
+    scores, flags, _ = SCORE_SHAPES[shape]
+    score = AnomalyScore(interaction_id="t", scores=scores, is_anomaly=flags)
+    return score.model_dump(), score.model_dump_json()
+
+
+@pytest.mark.parametrize("shape", list(SCORE_SHAPES))
+def test_anomaly_score_shape(shape):
+    """Test a score carries exactly the computed models' fields."""
+    scores, flags, absent = SCORE_SHAPES[shape]
+    d, _ = _dumped(shape)
+    
+    assert d["scores"] == scores
+    assert d["is_anomaly"] == flags
+    for key in absent:
+        assert key not in d["scores"]
+        assert key not in d["is_anomaly"]
+
+
+@pytest.mark.parametrize("shape", list(SCORE_SHAPES))
+def test_anomaly_score_json(shape):
+    """Test JSON output has no empty or null fields beyond the computed models."""
+    scores, flags, _ = SCORE_SHAPES[shape]
+    d, dumped_json = _dumped(shape)
+    parsed = json.loads(dumped_json)
+    
+    assert parsed == d
+    assert list(parsed["scores"]) == list(scores)
+    assert list(parsed["is_anomaly"]) == list(flags)
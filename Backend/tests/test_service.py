@@ -1,29 +1,90 @@
 """Unit tests for FastAPI service."""
 
+import json
+import warnings
+
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
+# Tests share src.service._model_state (a module global), so keep them on one
+# xdist worker: pytest -n auto --dist=loadgroup
+pytestmark = pytest.mark.xdist_group("service")
+
 # Note: These tests assume model artifacts exist
 # In a real setup, you'd mock the model loading
 
+_BASE_PAYLOAD = {
+    "interaction_id": "test-123",
+    "timestamp": "2025-01-01T10:00:00Z",
+    "csat": 4.5,
+    "ies": 80.0,
+    "complaints": 0,
+    "aht_seconds": 300,
+    "hold_time_seconds": 30,
+    "transfers": 0,
+    "channel": "voice",
+    "language": "en",
+    "queue": "billing",
+}
 
-@pytest.fixture
-def mock_model_state(monkeypatch):
-    """Mock model state for testing with multi-model support."""
-    import numpy as np
-    from unittest.mock import MagicMock
+# Request bodies encoded once at import and posted as raw bytes, so the
+# parametrized runs do not re-serialize the same payload
+_JSON_HEADERS = {"content-type": "application/json"}
+_BASE_BODY = json.dumps([_BASE_PAYLOAD]).encode()
+_BATCH_SIZES = (1, 64)
+_BATCH_BODIES = {
+    n: json.dumps([
+        {**_BASE_PAYLOAD, "interaction_id": f"test-{i}", "csat": 4.0 + i * 0.01, "ies": 75.0 + i * 0.1}
+        for i in range(n)
+    ]).encode()
+    for n in _BATCH_SIZES
+}
+
+
+# Fixed stub outputs, shared by every test; read-only so a scoring path that
+# writes into its input fails loudly instead of leaking into later tests
+_X = np.array([[1.0, 2.0, 3.0]])
+_S_IF = np.array([-0.5])
+_S_LOF = np.array([-0.6])
+for _arr in (_X, _S_IF, _S_LOF):
+    _arr.setflags(write=False)
+
+
+class _ArrayStub:
+    """
+    Stand-in for the preprocessor and models returning a fixed output.
     
-    # Create mock objects
-    mock_preprocessor = MagicMock()
-    mock_preprocessor.transform.return_value = np.array([[1.0, 2.0, 3.0]])
+    ``output`` is an array, or a function of the input for results that
+    depend on the batch size.
+    """
     
-    mock_iforest = MagicMock()
-    mock_iforest.score_samples.return_value = np.array([-0.5])
+    def __init__(self, output):
+        self.output = output
+        self.calls = 0
     
-    mock_lof = MagicMock()
-    mock_lof_detector = MagicMock()
-    mock_lof_detector.score_samples.return_value = np.array([-0.6])
-    mock_lof.detector_ = mock_lof_detector
+    def _respond(self, X):
+        self.calls += 1
+        return self.output(X) if callable(self.output) else self.output
+    
+    transform = _respond
+    score_samples = _respond
+
+
+class _LOFStub:
+    """Stand-in for the PyOD LOF wrapper, which scores through ``detector_``."""
+    
+    def __init__(self, output):
+        self.detector_ = _ArrayStub(output)
+
+
+@pytest.fixture
+def mock_model_state(monkeypatch):
+    """Mock model state for testing with multi-model support."""
+    # Create stub objects
+    mock_preprocessor = _ArrayStub(_X)
+    mock_iforest = _ArrayStub(_S_IF)
+    mock_lof = _LOFStub(_S_LOF)
     
     mock_iforest_metadata = {
         "threshold": 0.4,
@@ -31,6 +92,7 @@ def mock_model_state(monkeypatch):
         "algorithm": "IsolationForest",
         "n_samples": 1000,
         "n_features": 10,
+        "score_stats": {"min": 0.0, "max": 1.0},
     }
     
     mock_lof_metadata = {
@@ -39,6 +101,7 @@ def mock_model_state(monkeypatch):
         "algorithm": "LOF",
         "n_samples": 1000,
         "n_features": 10,
+        "score_stats": {"min": 0.0, "max": 1.0},
     }
     
     mock_config = {
@@ -53,33 +116,95 @@ def mock_model_state(monkeypatch):
         }
     }
     
-    # Patch model state
+    # Patch model state; monkeypatch restores whatever the session client's
+    # startup loaded once the test finishes
     from src import service
-    service._model_state["preprocessor"] = mock_preprocessor
-    service._model_state["models"] = {
+    monkeypatch.setitem(service._model_state, "preprocessor", mock_preprocessor)
+    monkeypatch.setitem(service._model_state, "transform_plan", None)
+    monkeypatch.setitem(service._model_state, "norm", None)
+    monkeypatch.setitem(service._model_state, "lof_score_samples", None)
+    monkeypatch.setitem(service._model_state, "models", {
         "iforest": mock_iforest,
         "lof": mock_lof,
-    }
-    service._model_state["metadata"] = {
+    })
+    monkeypatch.setitem(service._model_state, "metadata", {
         "iforest": mock_iforest_metadata,
         "lof": mock_lof_metadata,
-    }
-    service._model_state["config"] = mock_config
+    })
+    monkeypatch.setitem(service._model_state, "config", mock_config)
+
+
+@pytest.fixture(scope="session")
+def fitted_state(trained_bundle):
+    """
+    Model state built from the session-trained pipeline.
     
-    yield
+    Derived exactly as ``load_model_artifacts`` does, minus the disk round
+    trip, so scoring runs through the real preprocessor and models.
+    """
+    from src import service
     
-    # Cleanup
-    service._model_state["preprocessor"] = None
-    service._model_state["models"] = {}
-    service._model_state["metadata"] = {}
-    service._model_state["config"] = None
+    config, artifacts = trained_bundle
+    models = artifacts["models"]
+    metadata = artifacts["metadata"]
+    return {
+        "preprocessor": artifacts["preprocessor"],
+        "transform_plan": service._build_transform_plan(artifacts["preprocessor"], config),
+        "norm": service._build_ensemble_norm(metadata, config),
+        "lof_score_samples": service._build_lof_score_samples(models["lof"]),
+        "models": models,
+        "metadata": metadata,
+        "config": config,
+    }
 
 
 @pytest.fixture
+def real_model_state(monkeypatch, fitted_state):
+    """Serve the session-trained models for the duration of a test."""
+    from src import service
+    for key, value in fitted_state.items():
+        monkeypatch.setitem(service._model_state, key, value)
+
+
+@pytest.fixture(scope="session")
 def client():
-    """Create test client."""
+    """Create test client, shared by the whole session."""
+    from src.service import app
+    with TestClient(app) as c:
+        yield c
+
+
+class _LoopClient:
+    """Drive an ``httpx.AsyncClient`` on one event loop through a sync API."""
+    
+    def __init__(self, client, loop):
+        self._client = client
+        self._loop = loop
+    
+    def post(self, url, **kwargs):
+        return self._loop.run_until_complete(self._client.post(url, **kwargs))
+
+
+@pytest.fixture(scope="session")
+def asgi_client():
+    """
+    In-process ASGI client for the hot /score tests.
+    
+    Requests go straight into the app through httpx's ASGITransport on a
+    private event loop, skipping TestClient's portal thread. Startup does not
+    run, so use it together with ``mock_model_state``.
+    """
+    import asyncio
+    import httpx
     from src.service import app
-    return TestClient(app)
+    
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t")
+    try:
+        yield _LoopClient(client, loop)
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.close()
 
 
 def test_health_endpoint(client, mock_model_state):
@@ -100,166 +225,255 @@ def test_root_endpoint(client):
     assert "version" in data
 
 
-def test_score_endpoint_both_models(client, mock_model_state):
-    """Test scoring endpoint with both models (default)."""
-    payload = [
-        {
-            "interaction_id": "test-123",
-            "timestamp": "2025-01-01T10:00:00Z",
-            "csat": 4.5,
-            "ies": 80.0,
-            "complaints": 0,
-            "aht_seconds": 300,
-            "hold_time_seconds": 30,
-            "transfers": 0,
-            "channel": "voice",
-            "language": "en",
-            "queue": "billing",
-        }
-    ]
-    
-    response = client.post("/score", json=payload)
+@pytest.mark.parametrize(
+    "query,present,absent",
+    [
+        ("", {"iforest", "lof"}, set()),
+        ("?model=iforest", {"iforest"}, {"lof"}),
+        ("?model=lof", {"lof"}, {"iforest"}),
+    ],
+    ids=["both", "iforest", "lof"],
+)
+def test_score_endpoint_models(asgi_client, real_model_state, query, present, absent):
+    """Test scoring endpoint returns exactly the requested models."""
+    response = asgi_client.post(f"/score{query}", content=_BASE_BODY, headers=_JSON_HEADERS)
     assert response.status_code == 200
     data = response.json()
     
-    assert "scores" in data
-    assert "total_records" in data
     assert data["total_records"] == 1
     assert len(data["scores"]) == 1
     
     score = data["scores"][0]
-    assert "interaction_id" in score
     assert score["interaction_id"] == "test-123"
-    assert "scores" in score
-    assert "is_anomaly" in score
-    # Both models should be present
-    assert "iforest" in score["scores"]
-    assert "rcf" in score["scores"]
-    assert "iforest" in score["is_anomaly"]
-    assert "rcf" in score["is_anomaly"]
-    assert "ensemble" in score["is_anomaly"]
-
-
-def test_score_endpoint_iforest_only(client, mock_model_state):
-    """Test scoring endpoint with iforest only."""
-    payload = [
-        {
-            "interaction_id": "test-456",
-            "timestamp": "2025-01-01T10:00:00Z",
-            "csat": 4.5,
-            "ies": 80.0,
-            "complaints": 0,
-            "aht_seconds": 300,
-            "hold_time_seconds": 30,
-            "transfers": 0,
-            "channel": "voice",
-            "language": "en",
-            "queue": "billing",
-        }
-    ]
+    assert present <= set(score["scores"])
+    assert present <= set(score["is_anomaly"])
+    assert not absent & set(score["scores"])
+    assert not absent & set(score["is_anomaly"])
+    # The ensemble flag is only added when both models run
+    assert ("ensemble" in score["is_anomaly"]) == (not absent)
+    assert set(score["is_anomaly"].values()) <= {0, 1}
+    # Counted off the ensemble flag when present, else any model's flag
+    flags = score["is_anomaly"]
+    expected = flags["ensemble"] if "ensemble" in flags else max(flags.values())
+    assert data["anomalies_detected"] == expected
+
+
+def test_score_endpoint_columnar_format(asgi_client, mock_model_state):
+    """Test scoring endpoint with the columnar response layout."""
+    payload = [{**_BASE_PAYLOAD, "interaction_id": "test-789"}]
     
-    response = client.post("/score?model=iforest", json=payload)
+    response = asgi_client.post("/score?model=iforest&format=columnar", json=payload)
     assert response.status_code == 200
     data = response.json()
     
-    score = data["scores"][0]
-    assert "iforest" in score["scores"]
-    assert "rcf" not in score["scores"]
-    assert "iforest" in score["is_anomaly"]
-    assert "rcf" not in score["is_anomaly"]
-    assert "ensemble" not in score["is_anomaly"]
+    assert data["interaction_ids"] == ["test-789"]
+    assert data["scores"] == {"iforest": [0.5]}
+    assert data["is_anomaly"] == {"iforest": [1]}
+    assert data["anomalies_detected"] == 1
+    
+    response = asgi_client.post("/score?format=csv", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "format must be one of: records, columnar"
 
 
-def test_score_endpoint_rcf_only(client, mock_model_state):
-    """Test scoring endpoint with rcf only."""
-    payload = [
-        {
-            "interaction_id": "test-789",
-            "timestamp": "2025-01-01T10:00:00Z",
-            "csat": 4.5,
-            "ies": 80.0,
-            "complaints": 0,
-            "aht_seconds": 300,
-            "hold_time_seconds": 30,
-            "transfers": 0,
-            "channel": "voice",
-            "language": "en",
-            "queue": "billing",
-        }
-    ]
+def test_score_endpoint_invalid_model(client, mock_model_state):
+    """Test scoring endpoint with invalid model parameter."""
+    payload = [{**_BASE_PAYLOAD, "interaction_id": "test-999"}]
+    
+    response = client.post("/score?model=invalid_model", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "model must be one of: iforest, lof, both"
+
+
+@pytest.mark.parametrize("n_records", _BATCH_SIZES)
+def test_score_endpoint_multiple_records(asgi_client, mock_model_state, n_records):
+    """Test scoring a batch of records in one model pass."""
+    import numpy as np
+    
+    # Update mock to handle the whole batch
+    from src import service
+    service._model_state["preprocessor"].output = np.zeros((n_records, 3))
+    service._model_state["models"]["iforest"].output = np.full(n_records, -0.5)
+    service._model_state["models"]["lof"].detector_.output = np.full(n_records, -0.6)
     
-    response = client.post("/score?model=rcf", json=payload)
+    response = asgi_client.post("/score", content=_BATCH_BODIES[n_records], headers=_JSON_HEADERS)
     assert response.status_code == 200
     data = response.json()
     
-    score = data["scores"][0]
-    assert "rcf" in score["scores"]
-    assert "iforest" not in score["scores"]
-    assert "rcf" in score["is_anomaly"]
-    assert "iforest" not in score["is_anomaly"]
-    assert "ensemble" not in score["is_anomaly"]
+    assert data["total_records"] == n_records
+    assert len(data["scores"]) == n_records
+    assert [s["interaction_id"] for s in data["scores"]] == [f"test-{i}" for i in range(n_records)]
+    # Both scores clear their thresholds, so every record is flagged
+    assert data["anomalies_detected"] == n_records
+    
+    # The preprocessor and each model ran once for the whole batch
+    assert service._model_state["preprocessor"].calls == 1
+    assert service._model_state["models"]["iforest"].calls == 1
 
 
-def test_score_endpoint_invalid_model(client, mock_model_state):
-    """Test scoring endpoint with invalid model parameter."""
-    payload = [
-        {
-            "interaction_id": "test-999",
-            "timestamp": "2025-01-01T10:00:00Z",
-            "csat": 4.5,
-            "ies": 80.0,
-            "complaints": 0,
-            "aht_seconds": 300,
-            "hold_time_seconds": 30,
-            "transfers": 0,
-            "channel": "voice",
-            "language": "en",
-            "queue": "billing",
-        }
+def test_micro_batcher_splits_results(mock_model_state):
+    """Test coalesced requests get back only their own rows and models."""
+    import asyncio
+    import numpy as np
+    from src import service
+    from src.schema import InteractionRecord
+    
+    # Score each row by its position so the slicing is visible
+    service._model_state["preprocessor"].output = lambda df: np.zeros((len(df), 3))
+    service._model_state["models"]["iforest"].output = lambda X: -np.arange(len(X)) / 10
+    service._model_state["models"]["lof"].detector_.output = lambda X: -np.arange(len(X)) / 10
+    
+    records = [
+        InteractionRecord(interaction_id=f"test-{i}", timestamp="2025-01-01T10:00:00Z", csat=4.0)
+        for i in range(3)
     ]
     
-    response = client.post("/score?model=invalid_model", json=payload)
-    assert response.status_code == 400
-    assert "model must be one of" in response.json()["detail"]
+    async def run():
+        batcher = service.MicroBatcher(window_ms=50, max_records=100)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.submit(records[:2], ["iforest"]),
+                batcher.submit(records[2:], ["iforest", "lof"]),
+            )
+        finally:
+            await batcher.stop()
+    
+    (first_scores, _), (second_scores, second_flags) = asyncio.run(run())
+    
+    assert set(first_scores) == {"iforest"}
+    np.testing.assert_allclose(first_scores["iforest"], [0.0, 0.1])
+    assert set(second_scores) == {"iforest", "lof", "ensemble"}
+    np.testing.assert_allclose(second_scores["lof"], [0.2])
+    assert "ensemble" in second_flags
+
+
+def test_score_frame_uses_one_state_snapshot(mock_model_state, monkeypatch):
+    """Test a reload landing mid-pass does not mix in the new artifacts."""
+    from src import service
+    from src.schema import InteractionRecord
+    
+    reloaded = {
+        **service._model_state,
+        "models": {"iforest": _ArrayStub(np.array([-0.9])), "lof": _LOFStub(np.array([-0.9]))},
+    }
+    
+    def transform_then_reload(df):
+        # Publish the new state between preprocessing and model scoring
+        monkeypatch.setattr(service, "_model_state", reloaded)
+        return _X
+    
+    service._model_state["preprocessor"].output = transform_then_reload
+    records = [InteractionRecord(interaction_id="t", timestamp="2025-01-01T10:00:00Z", csat=4.0)]
+    
+    scores, _ = service._score_frame(records, ["iforest", "lof"])
+    
+    np.testing.assert_allclose(scores["iforest"], [0.5])
+    np.testing.assert_allclose(scores["lof"], [0.6])
+    assert service._model_state is reloaded
 
 
-def test_score_endpoint_multiple_records(client, mock_model_state):
-    """Test scoring with multiple records."""
-    from unittest.mock import MagicMock
+def test_score_batch_streams_jsonl(client, mock_model_state, monkeypatch):
+    """Test the JSONL endpoint scores in chunks and reports a bad line."""
+    import json
     import numpy as np
+    from src import service
+    
+    monkeypatch.setattr(service, "SCORE_STREAM_CHUNK_SIZE", 2)
+    service._model_state["preprocessor"].output = lambda df: np.zeros((len(df), 3))
+    service._model_state["models"]["iforest"].output = lambda X: -np.arange(len(X)) / 10
+    
+    lines = [
+        json.dumps({"interaction_id": f"test-{i}", "timestamp": "2025-01-01T10:00:00Z", "csat": 4.0})
+        for i in range(3)
+    ]
+    body = "\n".join(lines) + "\n\n" + "\n".join(lines[:2] + ['{"csat": 4.0}'])
+    
+    response = client.post("/score/batch?model=iforest", content=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["interaction_id"] for r in results[:3]] == ["test-0", "test-1", "test-2"]
+    # Chunks are scored independently: [0, 1], [2, 0'], then [1', bad]
+    assert [r["scores"]["iforest"] for r in results[:4]] == [0.0, 0.1, 0.0, 0.1]
+    # Blank lines still count towards the reported input line
+    assert results[-1] == {"error": "Field required", "line": 7}
+    assert len(results) == 5
     
-    # Update mock to handle multiple records
+    # Two records on one line are rejected, not scored as separate records
+    body = lines[0] + "\n" + lines[1] + "," + lines[2] + "\n"
+    response = client.post("/score/batch?model=iforest", content=body)
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert results[-1]["line"] == 2
+    assert len(results) == 1
+    
+    # Over-long lines end the stream, whether newline-terminated or not
+    monkeypatch.setattr(service, "SCORE_STREAM_MAX_LINE_BYTES", 200)
+    for tail in ["x" * 500 + "\n" + lines[2], "x" * 500]:
+        response = client.post("/score/batch?model=iforest", content=lines[0] + "\n" + tail)
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert results == [{"error": "Line exceeds 200 bytes", "line": 2}]
+
+
+def test_transform_records_matches_preprocessor():
+    """Test the record fast path reproduces preprocessor.transform."""
+    import numpy as np
+    import pandas as pd
     from src import service
-    service._model_state["preprocessor"].transform.return_value = np.array([
-        [1.0, 2.0, 3.0],
-        [1.5, 2.5, 3.5],
-    ])
-    service._model_state["models"]["iforest"].score_samples.return_value = np.array([-0.5, -0.3])
-    service._model_state["models"]["lof"].detector_.score_samples.return_value = np.array([-0.6, -0.4])
+    from src.features import build_preprocessor, prepare_features
+    from src.schema import InteractionRecord
     
-    payload = [
-        {
-            "interaction_id": f"test-{i}",
-            "timestamp": "2025-01-01T10:00:00Z",
-            "csat": 4.0 + i * 0.1,
-            "ies": 75.0 + i * 5,
-            "complaints": 0,
-            "aht_seconds": 300,
-            "hold_time_seconds": 30,
-            "transfers": 0,
-            "channel": "voice",
-            "language": "en",
-            "queue": "billing",
+    config = {
+        "features": {
+            "numeric": ["csat", "ies", "aht_seconds"],
+            "categorical": ["channel", "language"],
+            "drop_columns": [],
+            "identifier_columns": ["interaction_id", "timestamp"],
         }
-        for i in range(2)
+    }
+    records = [
+        InteractionRecord(interaction_id="a", timestamp="2025-01-01T10:00:00Z",
+                          csat=4.5, ies=80.0, aht_seconds=300, channel="voice", language="en"),
+        InteractionRecord(interaction_id="b", timestamp="2025-01-01T11:00:00Z",
+                          csat=None, ies=65.0, aht_seconds=450, channel="chat", language=None),
+        InteractionRecord(interaction_id="c", timestamp="2025-01-01T12:00:00Z",
+                          csat=3.0, ies=None, aht_seconds=350, channel="email", language="fr"),
     ]
+    df = pd.DataFrame([record.model_dump() for record in records])
+    feature_df, _ = prepare_features(df, config["features"], is_training=False)
     
-    response = client.post("/score", json=payload)
-    assert response.status_code == 200
-    data = response.json()
+    # Fit on the first two rows so the third has unseen categories
+    preprocessor = build_preprocessor(["csat", "ies", "aht_seconds"], ["channel", "language"])
+    preprocessor.fit(feature_df.iloc[:2])
+    expected = preprocessor.transform(feature_df)
+    
+    plan = service._build_transform_plan(preprocessor, config)
+    with warnings.catch_warnings():
+        # Arrays must not trip sklearn's missing feature names warning
+        warnings.simplefilter("error", UserWarning)
+        result = service._transform_records(records, plan, preprocessor.sparse_output_)
+        # ...while the preprocessor itself still transforms DataFrames cleanly
+        preprocessor.transform(feature_df)
+    
+    np.testing.assert_array_equal(np.asarray(result), np.asarray(expected))
+
+
+def test_lof_score_samples_matches_detector():
+    """Test the direct LOF scorer reproduces detector_.score_samples."""
+    import numpy as np
+    from pyod.models.lof import LOF
+    from src import service
+    
+    rng = np.random.default_rng(0)
+    X_train = rng.normal(size=(300, 5)).astype(np.float32)
+    X_new = rng.normal(size=(40, 5)).astype(np.float32)
+    lof = LOF(n_neighbors=10, novelty=True).fit(X_train)
+    
+    score_samples = service._build_lof_score_samples(lof)
     
-    assert data["total_records"] == 2
-    assert len(data["scores"]) == 2
+    assert score_samples is not None
+    np.testing.assert_allclose(score_samples(X_new), lof.detector_.score_samples(X_new), rtol=1e-6)
 
 
 def test_score_endpoint_invalid_data(client, mock_model_state):
@@ -1,19 +1,21 @@
 """Unit tests for training pipeline."""
 
-import tempfile
+import os
 from pathlib import Path
 
-import joblib
-import numpy as np
 import pandas as pd
 import pytest
 from sklearn.ensemble import IsolationForest
 
-from src.train import load_config, save_artifacts, train_model
+from src.io_utils import file_fingerprint
+from src.train import load_config, save_artifacts, train_models
+
+# Share the session-trained models on one xdist worker (--dist=loadgroup)
+pytestmark = pytest.mark.xdist_group("train")
 
 
 @pytest.fixture
-def temp_config_file():
+def temp_config_file(tmp_path):
     """Create temporary config file."""
     config_content = """
 data:
@@ -64,36 +66,9 @@ batch:
   chunk_size: 1000
 """
     
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-        f.write(config_content)
-        temp_path = f.name
-    
-    yield temp_path
-    
-    # Cleanup
-    Path(temp_path).unlink(missing_ok=True)
-
-
-@pytest.fixture
-def temp_training_data():
-    """Create temporary training data CSV."""
-    df = pd.DataFrame({
-        "interaction_id": [f"id{i}" for i in range(50)],
-        "timestamp": ["2025-01-01"] * 50,
-        "csat": np.random.uniform(1, 5, 50),
-        "ies": np.random.uniform(50, 100, 50),
-        "aht_seconds": np.random.uniform(200, 600, 50),
-        "channel": np.random.choice(["voice", "chat", "email"], 50),
-        "language": np.random.choice(["en", "es", "fr"], 50),
-    })
-    
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".csv", delete=False) as f:
-        df.to_csv(f.name, index=False)
-        temp_path = f.name
-    
-    yield temp_path
-    
-    Path(temp_path).unlink(missing_ok=True)
+    path = tmp_path / "config.yaml"
+    path.write_text(config_content)
+    return str(path)
 
 
 def test_load_config(temp_config_file):
@@ -106,55 +81,60 @@ def test_load_config(temp_config_file):
     assert config["model"]["params"]["n_estimators"] == 50
 
 
-def test_train_model_returns_artifacts(temp_config_file, temp_training_data, monkeypatch):
+def test_train_model_returns_artifacts(trained_bundle):
     """Test that training returns expected artifacts."""
-    # Load config and update training path
-    config = load_config(temp_config_file)
-    config["data"]["train_path"] = temp_training_data
-    
-    # Mock load_csv to avoid file I/O
-    def mock_load_config(path=None):
-        return config
-    
-    monkeypatch.setattr("src.train.load_config", mock_load_config)
-    
-    # Train model
-    preprocessor, model, metadata = train_model(config)
+    config, artifacts = trained_bundle
     
     # Check artifacts
-    assert preprocessor is not None
-    assert isinstance(model, IsolationForest)
+    assert artifacts["preprocessor"] is not None
+    assert isinstance(artifacts["models"]["iforest"], IsolationForest)
+    
+    metadata = artifacts["metadata"]["iforest"]
     assert isinstance(metadata, dict)
     assert "threshold" in metadata
     assert "n_samples" in metadata
     assert metadata["n_samples"] == 50
 
 
-def test_save_artifacts(temp_config_file, temp_training_data, monkeypatch):
+def test_train_records_data_fingerprint(trained_bundle, training_csv):
+    """Test training stamps the data fingerprint used to validate the feature cache."""
+    config, artifacts = trained_bundle
+    fingerprint = artifacts["metadata"]["global"]["train_fingerprint"]
+    
+    assert fingerprint == file_fingerprint(config["data"]["train_path"])
+    
+    # Regenerating the file with the same row count changes the fingerprint
+    # (mtime set explicitly, as two quick writes can share a coarse timestamp)
+    before = file_fingerprint(str(training_csv))
+    df = pd.read_csv(training_csv)
+    df.assign(csat=df["csat"].iloc[::-1].values).to_csv(training_csv, index=False)
+    os.utime(training_csv, ns=(before[0][2], before[0][2] + 1_000_000_000))
+    assert file_fingerprint(str(training_csv)) != before
+
+
+def test_train_models_rejects_missing_columns(train_config, training_csv):
+    """Test that training fails fast on data missing a configured feature."""
+    df = pd.read_csv(training_csv)
+    df.drop(columns=["ies"]).to_csv(training_csv, index=False)
+    
+    config = {**train_config, "data": {**train_config["data"], "train_path": str(training_csv)}}
+    
+    with pytest.raises(ValueError, match="missing required columns"):
+        train_models(config)
+
+
+def test_save_artifacts(trained_bundle, tmp_path_factory):
     """Test artifact saving."""
-    config = load_config(temp_config_file)
-    config["data"]["train_path"] = temp_training_data
+    config, artifacts = trained_bundle
     
-    def mock_load_config(path=None):
-        return config
+    # Save the shared models into a fresh artifacts directory
+    artifacts_dir = tmp_path_factory.mktemp("artifacts")
+    config = {**config, "artifacts": {**config["artifacts"], "dir": str(artifacts_dir)}}
     
-    monkeypatch.setattr("src.train.load_config", mock_load_config)
+    save_artifacts(artifacts, config)
     
-    # Create temporary artifacts directory
-    with tempfile.TemporaryDirectory() as temp_dir:
-        config["artifacts"]["dir"] = temp_dir
-        
-        # Train model
-        preprocessor, model, metadata = train_model(config)
-        
-        # Save artifacts
-        save_artifacts(preprocessor, model, metadata, config)
-        
-        # Check files exist
-        assert Path(temp_dir, "preprocessor.joblib").exists()
-        assert Path(temp_dir, "model.joblib").exists()
-        assert Path(temp_dir, "meta.joblib").exists()
-        
-        # Load and verify
-        loaded_model = joblib.load(Path(temp_dir, "model.joblib"))
-        assert isinstance(loaded_model, IsolationForest)
+    # Check files were written (model types are covered by
+    # test_train_model_returns_artifacts, so nothing is loaded back)
+    assert Path(artifacts_dir, "preprocessor.joblib").stat().st_size > 0
+    assert Path(artifacts_dir, "model_iforest.joblib").stat().st_size > 0
+    assert Path(artifacts_dir, "meta_iforest.joblib").stat().st_size > 0